@@ -1,7 +1,10 @@
 import sys
 import os
+import argparse
+import hashlib
 import logging
 import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -9,10 +12,9 @@ project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 load_dotenv()
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.agents import create_agent
 from langchain_core.tools import tool
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from utils.markdown_chunker import StructuredDocument
 
 # Configure logging
 logging.basicConfig(
@@ -25,6 +27,152 @@ logger = logging.getLogger(__name__)
 # Define paths
 MARKDOWN_DIR = project_root / "markdown_outputs"
 OUTPUT_DIR = project_root / "chunking_outputs"
+# Content hash + config of every file chunked in batch mode, to skip unchanged files.
+MANIFEST_PATH = OUTPUT_DIR / "chunk_manifest.json"
+
+CHUNK_CONFIGS = [
+    {"size": 5000, "overlap": 500, "suffix": "_chunks_5k"},
+    {"size": 2000, "overlap": 200, "suffix": "_chunks_2k"},
+]
+# Bump when chunk boundaries or record fields change, so batch mode re-chunks.
+CHUNKER_VERSION = "structured-2"
+
+
+def chunk_markdown_file(input_path: Path) -> list[str]:
+    """
+    Chunk one markdown file with every CHUNK_CONFIGS entry.
+
+    Returns:
+        The generated JSONL filenames (in OUTPUT_DIR).
+    """
+    input_path = Path(input_path)
+    markdown_filename = input_path.name
+
+    # Read content
+    content = input_path.read_text(encoding="utf-8")
+
+    # Prepare output path
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    generated_files = []
+
+    # Tokenize once; every size/overlap config is cut from the same token offsets.
+    # Chunks prefer section headings and never split fenced (```json image) blocks.
+    document = StructuredDocument(content)
+    logger.info(f"Tokenized {markdown_filename}: {document.n_tokens} tokens")
+
+    for config in CHUNK_CONFIGS:
+        chunks = document.chunks_with_metadata(config["size"], config["overlap"])
+
+        output_filename = f"{input_path.stem}{config['suffix']}.jsonl"
+        output_path = OUTPUT_DIR / output_filename
+
+        # Write to JSONL
+        logger.info(
+            f"Writing {len(chunks)} chunks (size={config['size']}) to {output_path}"
+        )
+        with open(output_path, "w", encoding="utf-8") as f:
+            for i, (chunk, structure) in enumerate(chunks):
+                record = {
+                    "id": f"{input_path.stem}{config['suffix']}_{i}",
+                    "content": chunk,
+                    "metadata": {"source": markdown_filename, **structure},
+                    "chunk_index": i,
+                    "token_size_config": config["size"],
+                }
+                f.write(json.dumps(record) + "\n")
+
+        generated_files.append(output_filename)
+
+    return generated_files
+
+
+def content_fingerprint(input_path: Path) -> str:
+    """sha256 of the file bytes, chunk configs and chunker version; changes when any does."""
+    digest = hashlib.sha256(
+        json.dumps([CHUNKER_VERSION, CHUNK_CONFIGS], sort_keys=True).encode("utf-8")
+    )
+    digest.update(Path(input_path).read_bytes())
+    return digest.hexdigest()
+
+
+def load_manifest() -> dict:
+    try:
+        return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest: dict) -> None:
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, MANIFEST_PATH)
+
+
+def chunk_corpus(
+    pattern: str = "*.md", workers: int | None = None, force: bool = False
+) -> dict:
+    """
+    Chunk every markdown file matching `pattern` (relative to MARKDOWN_DIR, or an
+    absolute glob) across a process pool, without any LLM in the loop.
+
+    Files whose fingerprint matches `chunk_manifest.json` and whose outputs still
+    exist are skipped unless `force` is set.
+
+    Returns:
+        {"chunked": [...], "skipped": [...], "failed": {filename: error}}
+    """
+    if Path(pattern).is_absolute():
+        root = Path(Path(pattern).anchor)
+        files = sorted(root.glob(str(Path(pattern).relative_to(root))))
+    else:
+        files = sorted(MARKDOWN_DIR.glob(pattern))
+    files = [f for f in files if f.is_file()]
+
+    manifest = load_manifest()
+    summary: dict = {"chunked": [], "skipped": [], "failed": {}}
+    todo: dict[Path, str] = {}
+    for path in files:
+        fingerprint = content_fingerprint(path)
+        entry = manifest.get(path.name) or {}
+        if (
+            not force
+            and entry.get("fingerprint") == fingerprint
+            and all((OUTPUT_DIR / name).exists() for name in entry.get("outputs", []))
+        ):
+            summary["skipped"].append(path.name)
+            continue
+        todo[path] = fingerprint
+
+    logger.info(
+        f"Batch chunking: {len(todo)} to chunk, {len(summary['skipped'])} unchanged "
+        f"(of {len(files)} matching '{pattern}')"
+    )
+    if not todo:
+        return summary
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+        futures = {pool.submit(chunk_markdown_file, path): path for path in todo}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                outputs = future.result()
+            except Exception as e:
+                logger.error(f"Chunking failed for {path.name}: {e}")
+                summary["failed"][path.name] = str(e)
+                continue
+            manifest[path.name] = {"fingerprint": todo[path], "outputs": outputs}
+            summary["chunked"].append(path.name)
+            # Persist progress so an interrupted run keeps finished files.
+            save_manifest(manifest)
+
+    logger.info(
+        f"Batch chunking done: {len(summary['chunked'])} chunked, "
+        f"{len(summary['skipped'])} skipped, {len(summary['failed'])} failed"
+    )
+    return summary
 
 
 @tool
@@ -49,50 +197,7 @@ def chunk_markdown_tool(markdown_filename: str) -> str:
             logger.error(error_msg)
             return error_msg
 
-        # Read content
-        content = input_path.read_text(encoding="utf-8")
-
-        # Prepare output path
-        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-        configs = [
-            {"size": 5000, "overlap": 500, "suffix": "_chunks_5k"},
-            {"size": 2000, "overlap": 200, "suffix": "_chunks_2k"},
-        ]
-
-        generated_files = []
-
-        for config in configs:
-            # Initialize splitter with tiktoken encoder
-            text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-                chunk_size=config["size"],
-                chunk_overlap=config["overlap"],
-            )
-
-            # Split text
-            docs = text_splitter.create_documents(
-                [content], metadatas=[{"source": markdown_filename}]
-            )
-
-            output_filename = f"{input_path.stem}{config['suffix']}.jsonl"
-            output_path = OUTPUT_DIR / output_filename
-
-            # Write to JSONL
-            logger.info(
-                f"Writing {len(docs)} chunks (size={config['size']}) to {output_path}"
-            )
-            with open(output_path, "w", encoding="utf-8") as f:
-                for i, doc in enumerate(docs):
-                    record = {
-                        "id": f"{input_path.stem}{config['suffix']}_{i}",
-                        "content": doc.page_content,
-                        "metadata": doc.metadata,
-                        "chunk_index": i,
-                        "token_size_config": config["size"],
-                    }
-                    f.write(json.dumps(record) + "\n")
-
-            generated_files.append(output_filename)
+        generated_files = chunk_markdown_file(input_path)
 
         return (
             f"Successfully created chunks. Output files: {', '.join(generated_files)}"
@@ -105,6 +210,35 @@ def chunk_markdown_tool(markdown_filename: str) -> str:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Markdown chunker agent")
+    parser.add_argument(
+        "file", nargs="?", help="Markdown file (in markdown_outputs/) for the agent to chunk."
+    )
+    parser.add_argument(
+        "--batch",
+        nargs="?",
+        const="*.md",
+        metavar="GLOB",
+        help="Chunk every markdown_outputs/ file matching GLOB (default *.md) directly, without the LLM agent.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Processes for --batch (default: all cores)."
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="With --batch, re-chunk files even if unchanged."
+    )
+    args = parser.parse_args()
+
+    if args.batch:
+        summary = chunk_corpus(args.batch, workers=args.workers, force=args.force)
+        logger.info(f"Batch summary: {json.dumps(summary)}")
+        if summary["failed"]:
+            sys.exit(1)
+        return
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain.agents import create_agent
+
     llm = ChatGoogleGenerativeAI(
         model="gemini-2.5-flash", temperature=0, convert_system_message_to_human=True
     )
@@ -120,9 +254,9 @@ def main():
 
     agent = create_agent(model=llm, tools=tools, system_prompt=sys_prompt)
 
-    if len(sys.argv) > 1:
+    if args.file:
         # If user provides a full path or just a name, handle it
-        arg_path = Path(sys.argv[1])
+        arg_path = Path(args.file)
         filename = arg_path.name
         user_input = f"Chunk the file {filename}"
     else:
@@ -1,11 +1,15 @@
 import argparse
 import sys
 import os
+import hashlib
 import logging
 import json
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from dotenv import load_dotenv
+import httpx
 from google import genai
 
 # Add project root to sys.path
@@ -19,12 +23,17 @@ load_dotenv()
 from knowledge_graph.models import GraphDocument
 
 # prompt used for entity extraction
-from knowledge_graph.prompts import render_graph_construction_instructions
+from knowledge_graph.prompts import (
+    graph_construction_instructions,
+    render_graph_construction_instructions,
+)
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import create_agent
 from langchain_core.tools import tool
 
+from utils.rate_limit import TokenBucket, retry_with_backoff
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -39,6 +48,16 @@ OUTPUT_DIR = project_root / "knowledge_graph_outputs"
 REGISTRY_PATH = OUTPUT_DIR / "global_entity_registry.json"
 MARKDOWN_DIR = project_root / "markdown_outputs"
 
+GRAPH_EXTRACTION_MODEL = "gemini-2.5-flash"
+# Concurrent extraction calls, the provider request quota shared by all of them,
+# and retries per batch for transient (429/5xx/network) errors.
+GRAPH_EXTRACTION_CONCURRENCY = int(os.getenv("GRAPH_EXTRACTION_CONCURRENCY", "4"))
+GRAPH_EXTRACTION_RPM = float(os.getenv("GRAPH_EXTRACTION_RPM", "60"))
+GRAPH_EXTRACTION_MAX_RETRIES = int(os.getenv("GRAPH_EXTRACTION_MAX_RETRIES", "4"))
+REQUEST_BUCKET = TokenBucket.per_minute(
+    GRAPH_EXTRACTION_RPM, burst=GRAPH_EXTRACTION_CONCURRENCY
+)
+
 # Regex to extract fenced json blocks from markdown
 FENCED_JSON_BLOCK_RE = re.compile(r"```json\s*([\s\S]*?)\s*```", re.IGNORECASE)
 
@@ -62,6 +81,77 @@ def save_global_registry(entities: set):
         logger.error(f"Failed to save registry: {e}")
 
 
+def _is_retryable_provider_error(e: Exception) -> bool:
+    """Rate limits, server errors and network failures are worth retrying."""
+    if isinstance(e, genai.errors.APIError):
+        return e.code in (408, 429) or (e.code or 0) >= 500
+    return isinstance(e, (ConnectionError, TimeoutError, httpx.TransportError))
+
+
+def _chunk_key(chunk: dict, chunks_filename: str) -> str:
+    """Chunk id, falling back to the same id `_build_source_doc` uses."""
+    return str(
+        chunk.get("id")
+        or f"{Path(chunks_filename).stem}_{chunk.get('chunk_index', 'unknown')}"
+    )
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _extraction_run_hash(include_metadata: bool, batch_size: int, token_limit: int) -> dict:
+    """Hashes of everything besides chunk content that determines the output lines."""
+    schema = json.dumps(GraphDocument.model_json_schema(), sort_keys=True)
+    return {
+        "model": GRAPH_EXTRACTION_MODEL,
+        "prompt_hash": _content_hash(graph_construction_instructions + schema),
+        "options_hash": _content_hash(
+            json.dumps([include_metadata, batch_size, token_limit])
+        ),
+    }
+
+
+def load_checkpoint(checkpoint_path: Path) -> dict | None:
+    if not checkpoint_path.exists():
+        return None
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        logger.warning(f"Failed to load checkpoint {checkpoint_path.name}, starting fresh.")
+        return None
+
+
+def save_checkpoint(checkpoint_path: Path, checkpoint: dict):
+    tmp_path = checkpoint_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def _rewrite_graph_lines(output_path: Path, keep_source_ids: set, order: dict | None = None):
+    """
+    Rewrite `output_path` keeping only complete lines whose source_id is in
+    `keep_source_ids`, optionally sorted by `order[source_id]`.
+    """
+    lines = []
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                source_id = json.loads(line)["source"]["source_id"]
+            except Exception:
+                continue
+            if source_id in keep_source_ids:
+                lines.append((source_id, line if line.endswith("\n") else line + "\n"))
+    if order is not None:
+        lines.sort(key=lambda item: order.get(item[0], len(order)))
+    tmp_path = output_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(line for _, line in lines)
+    os.replace(tmp_path, output_path)
+
+
 def _safe_json_loads_maybe_trailing_commas(s: str) -> dict:
     """
     Load JSON that may contain trailing commas before '}' or ']'.
@@ -312,23 +402,28 @@ def extract_graph_from_chunks_tool(
     include_metadata: bool = False,
     batch_size: int = 1,
     token_limit: int = 5500,
+    resume: bool = True,
 ) -> str:
     """
     Extracts knowledge graph nodes and relationships from a JSONL file containing text chunks.
     Uses a global entity registry to maintain consistency across documents.
+    An interrupted run is resumed from its checkpoint: only missing batches are extracted.
 
     Args:
         chunks_filename (str): The name of the JSONL file in 'chunking_outputs' (e.g., 'doc_chunks_5k.jsonl').
         include_metadata (bool): Whether to include original chunk metadata. Defaults to True.
         batch_size (int): Number of chunks to process in a single LLM call. Defaults to 1.
         token_limit (int): Approximate maximum number of tokens per batch.
+        resume (bool): Skip batches completed by a previous run with the same prompt,
+            model and options. Set to False to re-extract everything. Defaults to True.
 
     Returns:
         str: A message indicating success and the path to the output JSONL file.
     """
     logger.info(
         f"Tool invoked: extract_graph_from_chunks_tool for file '{chunks_filename}' "
-        f"with include_metadata={include_metadata}, batch_size={batch_size}, token_limit={token_limit}"
+        f"with include_metadata={include_metadata}, batch_size={batch_size}, "
+        f"token_limit={token_limit}, resume={resume}"
     )
 
     try:
@@ -359,92 +454,137 @@ def extract_graph_from_chunks_tool(
 
         logger.info(f"Processing {len(chunks)} chunks from {chunks_filename}")
 
-        # Process each chunk
-        with open(output_path, "w", encoding="utf-8") as out_f:
-            current_batch = []
-            current_batch_tokens = 0
-            processed_batches = 0
-
-            from knowledge_graph.models import Document, MetadataItem
-
-            def _build_source_doc(batch_chunks: list[dict]) -> Document:
-                # Prefer the chunk "id" if present; fall back to chunk_index.
-                chunk_ids = [
-                    c.get("id") for c in batch_chunks if c.get("id") is not None
-                ]
-                chunk_indices = [
-                    str(c.get("chunk_index"))
-                    for c in batch_chunks
-                    if c.get("chunk_index") is not None
-                ]
-
-                if len(batch_chunks) == 1:
-                    # Pointer to a single chunk.
-                    one = batch_chunks[0]
-                    cid = (
-                        one.get("id")
-                        or f"{Path(chunks_filename).stem}_{one.get('chunk_index', 'unknown')}"
-                    )
-                    meta = [
-                        MetadataItem(key="chunk_file", value=chunks_filename),
-                        MetadataItem(key="chunk_id", value=str(cid)),
-                    ]
-                    if one.get("chunk_index") is not None:
-                        meta.append(
-                            MetadataItem(
-                                key="chunk_index", value=str(one.get("chunk_index"))
-                            )
-                        )
-                    return Document(
-                        source_id=f"{chunks_filename}::{cid}",
-                        source_type="chunk",
-                        metadata=meta,
-                    )
+        # Form batches up front so they can be extracted concurrently and still
+        # be written in chunk order.
+        batches: list[list[dict]] = []
+        current_batch = []
+        current_batch_tokens = 0
+        for chunk_data in chunks:
+            content = chunk_data.get("content", "")
+            if not content:
+                continue
 
-                # Pointer to a batch (when you enable adaptive batching).
+            # Estimate tokens (approx 4 chars per token)
+            chunk_tokens = len(content) // 4
+
+            # Determine effective token limit
+            # If token_limit is not provided (0) and batch_size is default (1),
+            # default to 3000 tokens as per requirement.
+            effective_token_limit = token_limit
+            if effective_token_limit == 0 and batch_size == 1:
+                effective_token_limit = 5500
+
+            # Determine if we need to flush the current batch
+            should_flush = False
+
+            if effective_token_limit > 0:
+                # Adaptive batching based on tokens
+                # Flush if adding this chunk would exceed limit (and batch is not empty)
+                if current_batch and (
+                    current_batch_tokens + chunk_tokens > effective_token_limit
+                ):
+                    should_flush = True
+            else:
+                # Fixed batch size (only if batch_size > 1 explicitly provided)
+                if len(current_batch) >= batch_size:
+                    should_flush = True
+
+            if should_flush:
+                batches.append(current_batch)
+                current_batch = []
+                current_batch_tokens = 0
+
+            current_batch.append(chunk_data)
+            current_batch_tokens += chunk_tokens
+
+        # Remaining chunks
+        if current_batch:
+            batches.append(current_batch)
+
+        from knowledge_graph.models import Document, MetadataItem
+
+        def _build_source_doc(batch_chunks: list[dict]) -> Document:
+            # Prefer the chunk "id" if present; fall back to chunk_index.
+            chunk_ids = [
+                c.get("id") for c in batch_chunks if c.get("id") is not None
+            ]
+            chunk_indices = [
+                str(c.get("chunk_index"))
+                for c in batch_chunks
+                if c.get("chunk_index") is not None
+            ]
+
+            if len(batch_chunks) == 1:
+                # Pointer to a single chunk.
+                one = batch_chunks[0]
+                cid = (
+                    one.get("id")
+                    or f"{Path(chunks_filename).stem}_{one.get('chunk_index', 'unknown')}"
+                )
                 meta = [
                     MetadataItem(key="chunk_file", value=chunks_filename),
+                    MetadataItem(key="chunk_id", value=str(cid)),
                 ]
-                if chunk_ids:
-                    meta.append(
-                        MetadataItem(key="chunk_ids", value=json.dumps(chunk_ids))
-                    )
-                if chunk_indices:
+                if one.get("chunk_index") is not None:
                     meta.append(
                         MetadataItem(
-                            key="chunk_indices", value=json.dumps(chunk_indices)
+                            key="chunk_index", value=str(one.get("chunk_index"))
                         )
                     )
                 return Document(
-                    source_id=f"{chunks_filename}::batch::{chunk_ids[0] if chunk_ids else 'unknown'}",
-                    source_type="chunk_batch",
+                    source_id=f"{chunks_filename}::{cid}",
+                    source_type="chunk",
                     metadata=meta,
                 )
 
-            def process_batch(batch_chunks):
-                if not batch_chunks:
-                    return
-
-                # Combine content from batch
-                combined_content = ""
-                for chunk in batch_chunks:
-                    chunk_content = chunk.get("content", "")
-                    if chunk_content:
-                        combined_content += chunk_content + "\n\n"
-
-                if not combined_content.strip():
-                    return
-
-                # Get batch IDs for logging
-                batch_ids = [c.get("id") for c in batch_chunks]
-                logger.info(
-                    f"Processing batch of {len(batch_chunks)} chunks (IDs: {batch_ids})"
+            # Pointer to a batch (when you enable adaptive batching).
+            meta = [
+                MetadataItem(key="chunk_file", value=chunks_filename),
+            ]
+            if chunk_ids:
+                meta.append(
+                    MetadataItem(key="chunk_ids", value=json.dumps(chunk_ids))
+                )
+            if chunk_indices:
+                meta.append(
+                    MetadataItem(
+                        key="chunk_indices", value=json.dumps(chunk_indices)
+                    )
                 )
+            return Document(
+                source_id=f"{chunks_filename}::batch::{chunk_ids[0] if chunk_ids else 'unknown'}",
+                source_type="chunk_batch",
+                metadata=meta,
+            )
+
+        # Batches run on worker threads; the registry is shared between them.
+        registry_lock = threading.Lock()
+
+        def process_batch(batch_chunks: list[dict]) -> dict | None:
+            """Extract one batch; return the graph dict to write, or None."""
+            # Combine content from batch
+            combined_content = ""
+            for chunk in batch_chunks:
+                chunk_content = chunk.get("content", "")
+                if chunk_content:
+                    combined_content += chunk_content + "\n\n"
+
+            if not combined_content.strip():
+                return None
+
+            # Get batch IDs for logging
+            batch_ids = [c.get("id") for c in batch_chunks]
+            logger.info(
+                f"Processing batch of {len(batch_chunks)} chunks (IDs: {batch_ids})"
+            )
 
-                try:
-                    # Generate content using the logic from construction.py
-                    # IMPORTANT: refresh registry from disk for every batch so we always
-                    # include the latest known entities (even if another run updated it).
+            try:
+                # IMPORTANT: refresh registry from disk for every batch so we always
+                # include the latest known entities (even if another run updated it).
+                # Concurrent batches see the entities of every batch finished so far,
+                # but not those of the (up to workers - 1) earlier batches still in
+                # flight, so ids from those batches are not offered for reuse.
+                with registry_lock:
                     latest_from_disk = load_global_registry()
                     if latest_from_disk:
                         seen_entity_ids.update(latest_from_disk)
@@ -452,116 +592,191 @@ def extract_graph_from_chunks_tool(
                     # Pass existing entities to context
                     existing_entities_list = sorted(list(seen_entity_ids))
 
-                    source_doc = _build_source_doc(batch_chunks)
-                    source_json = json.dumps(
-                        source_doc.model_dump(), ensure_ascii=False
-                    )
+                source_doc = _build_source_doc(batch_chunks)
+                source_json = json.dumps(source_doc.model_dump(), ensure_ascii=False)
+                contents = render_graph_construction_instructions(
+                    chunk=combined_content,
+                    existing_entities=existing_entities_list,
+                    source_json=source_json,
+                    source_id=source_doc.source_id,
+                    source_type=source_doc.source_type,
+                    source_metadata_json=json.dumps(
+                        source_doc.model_dump().get("metadata", []),
+                        ensure_ascii=False,
+                    ),
+                )
 
-                    response = client.models.generate_content(
-                        model="gemini-2.5-flash",
-                        contents=render_graph_construction_instructions(
-                            chunk=combined_content,
-                            existing_entities=existing_entities_list,
-                            source_json=source_json,
-                            source_id=source_doc.source_id,
-                            source_type=source_doc.source_type,
-                            source_metadata_json=json.dumps(
-                                source_doc.model_dump().get("metadata", []),
-                                ensure_ascii=False,
-                            ),
-                        ),
+                def _generate():
+                    REQUEST_BUCKET.acquire()
+                    return client.models.generate_content(
+                        model=GRAPH_EXTRACTION_MODEL,
+                        contents=contents,
                         config=genai.types.GenerateContentConfig(
                             response_mime_type="application/json",
                             response_schema=GraphDocument,
                         ),
                     )
 
-                    if response.parsed:
-                        graph_doc: GraphDocument = response.parsed
+                response = retry_with_backoff(
+                    _generate,
+                    _is_retryable_provider_error,
+                    max_retries=GRAPH_EXTRACTION_MAX_RETRIES,
+                    description=f"Batch {batch_ids}",
+                )
 
-                        # Deterministically stamp provenance (pointer, not payload).
-                        graph_doc.source = source_doc
+                if not response.parsed:
+                    logger.warning(f"No parsed response for batch {batch_ids}")
+                    return None
 
-                        # Track extracted entities for context in future chunks
-                        for node in graph_doc.nodes:
-                            seen_entity_ids.add(node.id)
+                graph_doc: GraphDocument = response.parsed
 
-                        # Save registry immediately after processing the batch
-                        save_global_registry(seen_entity_ids)
+                # Deterministically stamp provenance (pointer, not payload).
+                graph_doc.source = source_doc
 
-                        # Convert to dict for serialization
-                        graph_dict = graph_doc.model_dump()
+                # Track extracted entities for context in later batches and save
+                # the registry immediately after processing the batch
+                with registry_lock:
+                    for node in graph_doc.nodes:
+                        seen_entity_ids.add(node.id)
+                    save_global_registry(seen_entity_ids)
 
-                        # Add metadata from the original chunk to keep traceability
-                        if include_metadata:
-                            # For batched processing, we store lists of original metadata
-                            graph_dict["original_chunk_ids"] = [
-                                c.get("id") for c in batch_chunks
-                            ]
-                            graph_dict["original_chunk_indices"] = [
-                                c.get("chunk_index") for c in batch_chunks
-                            ]
-                            graph_dict["original_metadata"] = [
-                                c.get("metadata") for c in batch_chunks
-                            ]
+                # Convert to dict for serialization
+                graph_dict = graph_doc.model_dump()
 
-                        out_f.write(json.dumps(graph_dict) + "\n")
-                        out_f.flush()
-                    else:
-                        logger.warning(f"No parsed response for batch {batch_ids}")
+                # Add metadata from the original chunk to keep traceability
+                if include_metadata:
+                    # For batched processing, we store lists of original metadata
+                    graph_dict["original_chunk_ids"] = [
+                        c.get("id") for c in batch_chunks
+                    ]
+                    graph_dict["original_chunk_indices"] = [
+                        c.get("chunk_index") for c in batch_chunks
+                    ]
+                    graph_dict["original_metadata"] = [
+                        c.get("metadata") for c in batch_chunks
+                    ]
 
-                except Exception as e:
-                    logger.error(f"Error processing batch {batch_ids}: {str(e)}")
+                return graph_dict
+
+            except Exception as e:
+                logger.error(f"Error processing batch {batch_ids}: {str(e)}")
+                return None
+
+        # Checkpoint: completed chunk ids (with content hashes) and, per written
+        # line, its source id with the chunk ids of its batch. Valid only for the
+        # same prompt, model and options, and only if every written batch still
+        # has the same composition (a line's source_id names only its first chunk).
+        checkpoint_path = OUTPUT_DIR / (input_path.stem + "_graph.checkpoint.json")
+        run_hash = _extraction_run_hash(include_metadata, batch_size, token_limit)
+        chunk_hashes = {
+            _chunk_key(c, chunks_filename): _content_hash(c.get("content", ""))
+            for c in chunks
+        }
+        batch_source_ids = [_build_source_doc(batch).source_id for batch in batches]
+        composition = {
+            source_id: [_chunk_key(c, chunks_filename) for c in batch]
+            for source_id, batch in zip(batch_source_ids, batches)
+        }
+        checkpoint = load_checkpoint(checkpoint_path) if resume else None
+        if (
+            checkpoint
+            and output_path.exists()
+            and {k: checkpoint.get(k) for k in run_hash} == run_hash
+            and isinstance(checkpoint.get("batches"), dict)
+            and all(
+                chunk_hashes.get(cid) == h
+                for cid, h in checkpoint.get("completed", {}).items()
+            )
+            and all(
+                composition.get(source_id) == chunk_ids
+                for source_id, chunk_ids in checkpoint["batches"].items()
+            )
+        ):
+            # Keep only the checkpointed lines: drops lines written after the last
+            # checkpoint save (or cut off mid-write), which get re-extracted below.
+            _rewrite_graph_lines(output_path, set(checkpoint["batches"]))
+        else:
+            if checkpoint:
+                logger.info(
+                    "Checkpoint does not match the current chunks, batches, prompt, model or options; starting fresh."
+                )
+            checkpoint = None
+        if checkpoint is None:
+            checkpoint = {**run_hash, "completed": {}, "batches": {}}
+        completed = checkpoint["completed"]
+
+        pending = [
+            batch
+            for source_id, batch in zip(batch_source_ids, batches)
+            if source_id not in checkpoint["batches"]
+        ]
+        resumed_batches = len(batches) - len(pending)
+        if resumed_batches:
+            logger.info(
+                f"Resuming from checkpoint: {resumed_batches} of {len(batches)} batches already extracted."
+            )
 
-            # Iterate through chunks and form batches
-            for i, chunk_data in enumerate(chunks):
-                content = chunk_data.get("content", "")
-                if not content:
-                    continue
+        workers = max(1, min(GRAPH_EXTRACTION_CONCURRENCY, len(pending)))
+        logger.info(
+            f"Extracting {len(pending)} batches with {workers} workers "
+            f"(rate limit {GRAPH_EXTRACTION_RPM} requests/min)"
+        )
+        if workers > 1:
+            logger.info(
+                f"Each batch's prompt lists the registry as of its start: entities from up to "
+                f"{workers - 1} earlier in-flight batches are missing. Set "
+                f"GRAPH_EXTRACTION_CONCURRENCY=1 for full serial id reuse."
+            )
 
-                # Estimate tokens (approx 4 chars per token)
-                chunk_tokens = len(content) // 4
-
-                # Determine effective token limit
-                # If token_limit is not provided (0) and batch_size is default (1),
-                # default to 3000 tokens as per requirement.
-                effective_token_limit = token_limit
-                if effective_token_limit == 0 and batch_size == 1:
-                    effective_token_limit = 5500
-
-                # Determine if we need to flush the current batch
-                should_flush = False
-
-                if effective_token_limit > 0:
-                    # Adaptive batching based on tokens
-                    # Flush if adding this chunk would exceed limit (and batch is not empty)
-                    if current_batch and (
-                        current_batch_tokens + chunk_tokens > effective_token_limit
-                    ):
-                        should_flush = True
-                else:
-                    # Fixed batch size (only if batch_size > 1 explicitly provided)
-                    if len(current_batch) >= batch_size:
-                        should_flush = True
-
-                if should_flush:
-                    process_batch(current_batch)
-                    current_batch = []
-                    current_batch_tokens = 0
-                    processed_batches += 1
-
-                current_batch.append(chunk_data)
-                current_batch_tokens += chunk_tokens
-
-            # Process any remaining chunks
-            if current_batch:
-                process_batch(current_batch)
+        # Extract concurrently; a result is written once every earlier batch has
+        # been written, so the output stays in chunk order.
+        written = 0
+        with open(
+            output_path, "a" if resumed_batches else "w", encoding="utf-8"
+        ) as out_f, ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(process_batch, batch): i for i, batch in enumerate(pending)
+            }
+            finished: dict[int, dict | None] = {}
+            next_to_write = 0
+            for future in as_completed(futures):
+                finished[futures[future]] = future.result()
+                while next_to_write in finished:
+                    graph_dict = finished.pop(next_to_write)
+                    if graph_dict is not None:
+                        out_f.write(json.dumps(graph_dict) + "\n")
+                        out_f.flush()
+                        written += 1
+                        # Checkpoint only what is on disk.
+                        chunk_ids = [
+                            _chunk_key(c, chunks_filename) for c in pending[next_to_write]
+                        ]
+                        for cid in chunk_ids:
+                            completed[cid] = chunk_hashes[cid]
+                        checkpoint["batches"][graph_dict["source"]["source_id"]] = chunk_ids
+                        save_checkpoint(checkpoint_path, checkpoint)
+                    next_to_write += 1
+
+        if resumed_batches and written:
+            # Appended batches go back to chunk order.
+            order = {source_id: i for i, source_id in enumerate(batch_source_ids)}
+            _rewrite_graph_lines(output_path, set(checkpoint["batches"]), order)
+
+        failed = len(pending) - written
+        if failed:
+            logger.warning(
+                f"{failed} batches failed; rerun to extract only those (checkpoint: {checkpoint_path.name})."
+            )
 
         # Save updated registry
         # save_global_registry(seen_entity_ids)
         logger.info(f"Updated registry with {len(seen_entity_ids)} entities.")
 
-        return f"Successfully processed chunks. Graph data saved to: {output_filename}"
+        return (
+            f"Successfully processed chunks ({written} batches extracted, "
+            f"{resumed_batches} resumed from checkpoint, {failed} failed). "
+            f"Graph data saved to: {output_filename}"
+        )
 
     except Exception as e:
         error_msg = f"Error during graph extraction: {str(e)}"
@@ -594,6 +809,11 @@ def main():
         default=0,
         help="Adaptive batching token limit (approx). Defaults to 3000 if batch-size is 1.",
     )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignore the extraction checkpoint and re-extract every chunk",
+    )
 
     args = parser.parse_args()
 
@@ -637,6 +857,9 @@ def main():
     elif args.batch_size > 1:
         user_input += f" using a batch size of {args.batch_size}"
 
+    if args.no_resume:
+        user_input += " without resuming from the checkpoint (resume=False)"
+
     logger.info(f"Starting graph construction agent with input: {user_input}")
 
     try:
@@ -1,20 +1,36 @@
 import sys
+import os
 import argparse
 import logging
 import json
+import shutil
+import hashlib
 from pathlib import Path
 from dotenv import load_dotenv
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
 from langchain.agents import create_agent
 from langchain_core.tools import tool
-from langchain_core.embeddings import Embeddings
-from sentence_transformers import SentenceTransformer
 from langchain_google_genai import ChatGoogleGenerativeAI
 
 project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
+from utils.embeddings import EmbeddingGemmaWrapper
+from utils.embedding_cache import EmbeddingCache
+from utils.vector_store import (
+    DOCSTORE_FILENAME,
+    FAISS_INDEX_FILENAME,
+    INDEX_TYPES,
+    build_faiss_index,
+    load_faiss_vector_store,
+    load_index_config,
+    migrate_pickled_docstore,
+    save_faiss_vector_store,
+    supports_remove,
+    vector_store_from_index,
+)
+
 load_dotenv()
 
 # Configure logging
@@ -28,43 +44,164 @@ logger = logging.getLogger(__name__)
 # Define paths
 CHUNKS_DIR = project_root / "chunking_outputs"
 VECTOR_STORE_DIR = project_root / "vector_store_outputs"
+EMBEDDING_CACHE_DIR = VECTOR_STORE_DIR / "embedding_cache"
+INDEX_PATH = VECTOR_STORE_DIR / "index"
+MANIFEST_FILENAME = "manifest.json"
+EMBEDDING_MODEL_NAME = "google/embeddinggemma-300m"
 
+# Ingestion options set by the CLI (main) take precedence over tool arguments,
+# so they never depend on the LLM copying them into the tool call.
+INCREMENTAL_ENV = "VECTOR_STORE_INCREMENTAL"
+INDEX_TYPE_ENV = "VECTOR_STORE_INDEX_TYPE"
+NPROBE_ENV = "VECTOR_STORE_NPROBE"
+EF_SEARCH_ENV = "VECTOR_STORE_EF_SEARCH"
 
-class EmbeddingGemmaWrapper(Embeddings):
-    """Wrapper for Google's EmbeddingGemma model via SentenceTransformers."""
 
-    def __init__(self, model_name: str = "google/embeddinggemma-300m"):
-        self.model = SentenceTransformer(model_name)
+def _file_sha256(file_path: Path) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
 
-    def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        embeddings = self.model.encode(
-            texts,
-            prompt_name="document",
-            normalize_embeddings=True,
-        )
-        return embeddings.tolist()
 
-    def embed_query(self, text: str) -> list[float]:
-        embedding = self.model.encode(
-            text,
-            prompt_name="query",
-            normalize_embeddings=True,
-        )
-        return embedding.tolist()
+def _load_chunk_documents(file_path: Path) -> tuple[list[Document], list[str]]:
+    """
+    Parse one *_2k.jsonl chunk file into LangChain Documents.
+
+    Returns the documents plus their docstore ids (`<source_file>::<chunk_id>`),
+    which stay stable across runs so incremental updates can delete them later.
+    """
+    documents: list[Document] = []
+    doc_ids: list[str] = []
+    seen_ids: set[str] = set()
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                chunk_data = json.loads(line)
+                content = chunk_data.get("content", "")
+
+                # Skip empty chunks
+                if not content:
+                    continue
+
+                # Extract metadata (assuming 'metadata' field exists, or construct it)
+                # We also keep 'id' and source filename
+                metadata = chunk_data.get("metadata", {})
+                if isinstance(metadata, dict):
+                    metadata["chunk_id"] = chunk_data.get(
+                        "id", f"{file_path.stem}_{line_num}"
+                    )
+                    metadata["source_file"] = file_path.name
+                else:
+                    metadata = {
+                        "chunk_id": chunk_data.get(
+                            "id", f"{file_path.stem}_{line_num}"
+                        ),
+                        "source_file": file_path.name,
+                    }
+
+                doc_id = f"{file_path.name}::{metadata['chunk_id']}"
+                if doc_id in seen_ids:
+                    doc_id = f"{doc_id}::{line_num}"
+                seen_ids.add(doc_id)
+
+                documents.append(Document(page_content=content, metadata=metadata))
+                doc_ids.append(doc_id)
+
+            except json.JSONDecodeError:
+                logger.warning(
+                    f"Failed to parse JSON at line {line_num} in {file_path.name}"
+                )
+
+    return documents, doc_ids
+
+
+def _load_manifest(index_path: Path) -> dict | None:
+    manifest_path = index_path / MANIFEST_FILENAME
+    if not manifest_path.exists():
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Failed to read vector store manifest, ignoring it: {e}")
+        return None
+
+
+def _save_vector_store(
+    vector_store: FAISS, manifest: dict, index_config: dict, index_path: Path
+):
+    """
+    Write the store + manifest to a sibling temp directory and swap it in, so a
+    query agent loading the index never sees a half-written directory.
+    """
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    old_path = index_path.with_name(index_path.name + ".old")
+    for p in (tmp_path, old_path):
+        if p.exists():
+            shutil.rmtree(p)
+
+    save_faiss_vector_store(vector_store, tmp_path, index_config)
+    with open(tmp_path / MANIFEST_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    if index_path.exists():
+        index_path.rename(old_path)
+    tmp_path.rename(index_path)
+    if old_path.exists():
+        shutil.rmtree(old_path)
+
 
 @tool
-def scan_and_ingest_chunks(dummy_arg: str = "") -> str:
+def scan_and_ingest_chunks(
+    dummy_arg: str = "",
+    incremental: bool = False,
+    index_type: str = "",
+    nprobe: int = 0,
+    ef_search: int = 0,
+) -> str:
     """
     Scans the chunking_outputs directory for files ending in '_2k.jsonl',
     generates embeddings for the chunks using EmbeddingGemma, and ingests them into a FAISS vector store.
+    Chunk embeddings are cached on disk by content hash, so unchanged chunks are never re-embedded.
 
     Args:
         dummy_arg (str): Not used, just for tool signature.
+        incremental (bool): Update the existing index in place using its manifest: only
+            chunks from new or changed files are added, and vectors of changed/removed
+            files are deleted. Falls back to a full rebuild if no usable index exists.
+        index_type (str): FAISS index type: "flat" (exact), "hnsw" or "ivfpq". Empty keeps the
+            existing index's type in incremental mode, and means "flat" otherwise.
+        nprobe (int): IVF-PQ lists probed per query (0 = default). Higher is slower but more accurate.
+        ef_search (int): HNSW search beam width (0 = default). Higher is slower but more accurate.
 
     Returns:
         str: A message indicating the result of the vector store creation.
     """
-    logger.info("Tool invoked: scan_and_ingest_chunks")
+    incremental = incremental or os.getenv(INCREMENTAL_ENV) == "1"
+    index_type = os.getenv(INDEX_TYPE_ENV) or index_type
+    nprobe = int(os.getenv(NPROBE_ENV) or nprobe or 0)
+    ef_search = int(os.getenv(EF_SEARCH_ENV) or ef_search or 0)
+    if not index_type:
+        index_type = (
+            load_index_config(INDEX_PATH).get("index_type", "flat")
+            if incremental and (INDEX_PATH / FAISS_INDEX_FILENAME).exists()
+            else "flat"
+        )
+
+    logger.info(
+        f"Tool invoked: scan_and_ingest_chunks (incremental={incremental}, index_type={index_type}, "
+        f"nprobe={nprobe}, ef_search={ef_search})"
+    )
+
+    if index_type not in INDEX_TYPES:
+        return f"Error: Unknown index_type '{index_type}'. Expected one of {list(INDEX_TYPES)}."
 
     try:
         # Ensure output directory exists
@@ -75,7 +212,7 @@ def scan_and_ingest_chunks(dummy_arg: str = "") -> str:
             return f"Error: Input directory not found at {CHUNKS_DIR}"
 
         # Find all matching files
-        chunk_files = list(CHUNKS_DIR.glob("*_2k.jsonl"))
+        chunk_files = sorted(CHUNKS_DIR.glob("*_2k.jsonl"))
 
         if not chunk_files:
             return (
@@ -86,78 +223,164 @@ def scan_and_ingest_chunks(dummy_arg: str = "") -> str:
             f"Found {len(chunk_files)} files to process: {[f.name for f in chunk_files]}"
         )
 
-        documents = []
-        total_chunks = 0
-
-        # Process each file
-        for file_path in chunk_files:
-            logger.info(f"Processing file: {file_path.name}")
-            try:
-                file_chunk_count = 0
-                with open(file_path, "r", encoding="utf-8") as f:
-                    for line_num, line in enumerate(f, 1):
-                        line = line.strip()
-                        if not line:
-                            continue
-
-                        try:
-                            chunk_data = json.loads(line)
-                            content = chunk_data.get("content", "")
-
-                            # Skip empty chunks
-                            if not content:
-                                continue
-
-                            # Extract metadata (assuming 'metadata' field exists, or construct it)
-                            # We also keep 'id' and source filename
-                            metadata = chunk_data.get("metadata", {})
-                            if isinstance(metadata, dict):
-                                metadata["chunk_id"] = chunk_data.get(
-                                    "id", f"{file_path.stem}_{line_num}"
-                                )
-                                metadata["source_file"] = file_path.name
-                            else:
-                                metadata = {
-                                    "chunk_id": chunk_data.get(
-                                        "id", f"{file_path.stem}_{line_num}"
-                                    ),
-                                    "source_file": file_path.name,
-                                }
-
-                            doc = Document(page_content=content, metadata=metadata)
-                            documents.append(doc)
-                            file_chunk_count += 1
-
-                        except json.JSONDecodeError:
-                            logger.warning(
-                                f"Failed to parse JSON at line {line_num} in {file_path.name}"
-                            )
+        file_hashes = {f.name: _file_sha256(f) for f in chunk_files}
+        # fp16/int8 vectors differ from full-precision ones, so they never share
+        # an index (or cache namespace). None means full precision.
+        quantization = os.getenv("EMBEDDING_QUANTIZATION") or None
+
+        previous = _load_manifest(INDEX_PATH) if incremental else None
+        if incremental and (
+            previous is None
+            or previous.get("model_name") != EMBEDDING_MODEL_NAME
+            or previous.get("quantization") != quantization
+            or not (INDEX_PATH / FAISS_INDEX_FILENAME).exists()
+            or not (INDEX_PATH / DOCSTORE_FILENAME).exists()
+        ):
+            logger.info(
+                "No compatible existing index/manifest found; falling back to a full rebuild."
+            )
+            previous = None
 
+        previous_config = load_index_config(INDEX_PATH) if previous is not None else None
+        if previous_config is not None and previous_config.get("index_type") != index_type:
+            logger.info(
+                f"Existing index is '{previous_config.get('index_type')}', requested '{index_type}'; "
+                "falling back to a full rebuild."
+            )
+            previous = None
+
+        previous_files: dict = (previous or {}).get("files", {})
+        if previous is not None:
+            files_to_embed = [
+                f
+                for f in chunk_files
+                if previous_files.get(f.name, {}).get("sha256") != file_hashes[f.name]
+            ]
+            stale_files = [
+                name
+                for name, entry in previous_files.items()
+                if file_hashes.get(name) != entry.get("sha256")
+            ]
+            if stale_files and not supports_remove(previous_config):
                 logger.info(
-                    f"Extracted {file_chunk_count} chunks from {file_path.name}"
+                    f"'{index_type}' indexes cannot delete vectors; falling back to a full rebuild."
                 )
-                total_chunks += file_chunk_count
+                previous = None
+            elif not files_to_embed and not stale_files:
+                msg = f"Vector store at {INDEX_PATH} is already up to date."
+                logger.info(msg)
+                return msg
+
+        if previous is not None:
+            logger.info(
+                f"Incremental update: {len(files_to_embed)} new/changed file(s), "
+                f"{len(stale_files)} changed/removed file(s) to drop"
+            )
+        else:
+            previous_files = {}
+            files_to_embed = list(chunk_files)
+            stale_files = []
+
+        documents: list[Document] = []
+        doc_ids: list[str] = []
+        manifest_files: dict = {
+            name: entry
+            for name, entry in previous_files.items()
+            if name not in stale_files
+        }
 
+        # Process each file
+        for file_path in files_to_embed:
+            logger.info(f"Processing file: {file_path.name}")
+            try:
+                file_docs, file_doc_ids = _load_chunk_documents(file_path)
             except Exception as e:
                 logger.error(f"Error reading file {file_path.name}: {e}")
+                continue
 
-        if not documents:
+            logger.info(f"Extracted {len(file_docs)} chunks from {file_path.name}")
+            documents.extend(file_docs)
+            doc_ids.extend(file_doc_ids)
+            manifest_files[file_path.name] = {
+                "sha256": file_hashes[file_path.name],
+                "doc_ids": file_doc_ids,
+            }
+
+        if not documents and previous is None:
             return "No valid chunks found to ingest."
 
+        total_chunks = len(documents)
         logger.info(f"Total chunks to ingest: {total_chunks}")
         logger.info("Initializing EmbeddingGemma model...")
 
-        embeddings = EmbeddingGemmaWrapper(model_name="google/embeddinggemma-300m")
+        embeddings = EmbeddingGemmaWrapper(
+            model_name=EMBEDDING_MODEL_NAME, quantization=quantization
+        )
 
         logger.info("Creating FAISS vector store...")
         try:
-            vector_store = FAISS.from_documents(documents, embeddings)
+            # Only chunks whose text hash is not cached yet are sent to the model.
+            cache = EmbeddingCache(
+                EMBEDDING_CACHE_DIR,
+                model_name=embeddings.model_name,
+                prompt_name="document",
+                quantization=quantization,
+            )
+            texts = [doc.page_content for doc in documents]
+            vectors = cache.embed(texts, embeddings.encode_documents)
+            metadatas = [doc.metadata for doc in documents]
+
+            if previous is not None:
+                vector_store = load_faiss_vector_store(
+                    INDEX_PATH, embeddings, in_memory=True
+                )
+                index_config = dict(previous_config)
+                if nprobe and index_type == "ivfpq":
+                    index_config["nprobe"] = nprobe
+                if ef_search and index_type == "hnsw":
+                    index_config["ef_search"] = ef_search
+                known_ids = set(vector_store.index_to_docstore_id.values())
+                stale_ids = [
+                    doc_id
+                    for name in stale_files
+                    for doc_id in previous_files[name].get("doc_ids", [])
+                    if doc_id in known_ids
+                ]
+                if stale_ids:
+                    logger.info(f"Removing {len(stale_ids)} stale vectors")
+                    vector_store.delete(stale_ids)
+                if documents:
+                    vector_store.add_embeddings(
+                        text_embeddings=list(zip(texts, vectors)),
+                        metadatas=metadatas,
+                        ids=doc_ids,
+                    )
+            else:
+                index, index_config = build_faiss_index(
+                    vectors,
+                    index_type=index_type,
+                    nprobe=nprobe or None,
+                    ef_search=ef_search or None,
+                )
+                vector_store = vector_store_from_index(
+                    index, embeddings, documents, doc_ids
+                )
+
+            manifest = {
+                "model_name": EMBEDDING_MODEL_NAME,
+                "quantization": quantization,
+                "files": manifest_files,
+            }
 
             # Save to disk
-            index_path = VECTOR_STORE_DIR / "index"
-            vector_store.save_local(str(index_path))
+            _save_vector_store(vector_store, manifest, index_config, INDEX_PATH)
 
-            msg = f"Successfully created vector store with {total_chunks} chunks. Saved to {index_path}"
+            action = "updated" if previous is not None else "created"
+            msg = (
+                f"Successfully {action} vector store with {total_chunks} new chunks "
+                f"({vector_store.index.ntotal} total, {index_config['index_type']} index). "
+                f"Saved to {INDEX_PATH}"
+            )
             logger.info(msg)
             return msg
 
@@ -180,8 +403,68 @@ def main():
         default="start chunking",
         help="Input trigger for the agent (default: 'start chunking')",
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Update the existing index (add new/changed files, drop stale vectors) instead of rebuilding it",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Chunks per embedding batch (default: EMBEDDING_BATCH_SIZE or 32)",
+    )
+    parser.add_argument(
+        "--quantization",
+        choices=["fp16", "int8"],
+        default=None,
+        help="Run the embedding model in fp16 or dynamically quantized int8 (CPU)",
+    )
+    parser.add_argument(
+        "--index-type",
+        choices=list(INDEX_TYPES),
+        default=None,
+        help="FAISS index type: flat (exact), hnsw or ivfpq (default: flat; with --incremental, the existing index's type)",
+    )
+    parser.add_argument(
+        "--nprobe",
+        type=int,
+        default=0,
+        help="IVF-PQ lists probed per query (recall vs latency)",
+    )
+    parser.add_argument(
+        "--ef-search",
+        type=int,
+        default=0,
+        help="HNSW efSearch (recall vs latency)",
+    )
+    parser.add_argument(
+        "--migrate-legacy-docstore",
+        action="store_true",
+        help="Convert a legacy index.pkl docstore into docstore.sqlite (unpickles it; trusted indexes only) and exit",
+    )
     args = parser.parse_args()
 
+    if args.migrate_legacy_docstore:
+        rows = migrate_pickled_docstore(INDEX_PATH)
+        logger.info(f"Legacy docstore at {INDEX_PATH} migrated ({rows} rows)")
+        return
+
+    # The tool builds its own embedding wrapper, which reads these env defaults.
+    if args.batch_size:
+        os.environ["EMBEDDING_BATCH_SIZE"] = str(args.batch_size)
+    if args.quantization:
+        os.environ["EMBEDDING_QUANTIZATION"] = args.quantization
+    # Index options reach the tool the same way, independent of the LLM's tool call.
+    if args.incremental:
+        os.environ[INCREMENTAL_ENV] = "1"
+    if args.index_type:
+        os.environ[INDEX_TYPE_ENV] = args.index_type
+    if args.nprobe:
+        os.environ[NPROBE_ENV] = str(args.nprobe)
+    if args.ef_search:
+        os.environ[EF_SEARCH_ENV] = str(args.ef_search)
+
     # Initialize LLM for the agent
     llm = ChatGoogleGenerativeAI(
         model="gemini-2.5-flash",
@@ -195,15 +478,19 @@ def main():
         "You are an AI assistant responsible for initializing and populating a vector store. "
         "Your task is to use the 'scan_and_ingest_chunks' tool to process text chunks from the 'chunking_outputs' directory "
         "and create a FAISS vector index using EmbeddingGemma embeddings. "
+        "Index options (incremental mode, index type, nprobe, ef_search) are already configured; "
+        "call the tool with its default arguments. "
         "Always report the outcome of the tool execution clearly."
     )
 
     agent = create_agent(model=llm, tools=tools, system_prompt=sys_prompt)
 
-    logger.info(f"Starting Vector Store Creation Agent with input: '{args.input}'")
+    user_input = args.input
+
+    logger.info(f"Starting Vector Store Creation Agent with input: '{user_input}'")
 
     try:
-        result = agent.invoke({"messages": [{"role": "user", "content": args.input}]})
+        result = agent.invoke({"messages": [{"role": "user", "content": user_input}]})
         logger.info(f"Agent Result: {result['messages'][-1].content}")
 
     except Exception as e:
@@ -26,6 +26,7 @@ from knowledge_graph.models import (
     Document,
     MetadataItem,
 )
+from utils.graph_client import bump_graph_version
 
 
 def connect_to_neo4j() -> Neo4jGraph:
@@ -217,6 +218,8 @@ def load_jsonl_and_ingest(file_path: str, graph: Neo4jGraph):
                     )
             except Exception as e:
                 print(f"Warning: failed to upsert node properties: {e}")
+            # Query processes compare this stamp to drop their cached graph schema.
+            bump_graph_version()
             print("Ingestion complete.")
         else:
             print("No valid documents found to ingest.")
@@ -5,6 +5,13 @@ import logging
 import json
 import time
 import uuid
+import hashlib
+import threading
+import contextvars
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime, timezone
 from pathlib import Path
 from dotenv import load_dotenv
@@ -12,24 +19,80 @@ from dotenv import load_dotenv
 project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
-from langchain_community.vectorstores import FAISS
-from langchain_neo4j import GraphCypherQAChain, Neo4jGraph
-from langchain_core.embeddings import Embeddings
-from langchain_core.prompts import PromptTemplate
-from sentence_transformers import SentenceTransformer
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.agents import create_agent
-from langchain_core.tools import tool
 
-from utils.rag_rephrase import generate_rag_subqueries
+from utils.vector_store import (
+    documents_for_rows,
+    index_version,
+    load_faiss_vector_store,
+    search_by_vectors,
+)
+from utils.rag_rephrase import generate_rag_subqueries, normalize_query
+from utils.query_cache import LRUTTLCache, SqliteTTLCache, TieredCache
+from utils.rag_fusion import fuse_hits, select_within_budget
+from utils.graph_client import get_graph_client, graph_version
+from utils.chunk_store import get_chunk_store
+from utils.answer_cache import SemanticAnswerCache
+from utils.lazy import lazy_prompt_template, lazy_tool
+
+# Heavy SDKs (langchain_neo4j, langchain_google_genai, sentence-transformers) and
+# LangChain prompt/tool machinery are imported on first use, so `--help` and
+# answer-cache hits start fast.
+if TYPE_CHECKING:
+    from langchain_neo4j import GraphCypherQAChain, Neo4jGraph
+
+    from utils.graph_client import GraphClient
 
 vector_store = None
 llm_for_tools = None
-LAST_QUERY_TRACE: dict = {
+
+_query_trace_var: contextvars.ContextVar[dict] = contextvars.ContextVar("query_trace")
+_default_query_trace: dict = {
     "rag": None,
     "graph": None,
 }
 
+
+class _QueryTrace(MutableMapping):
+    """
+    Per-tool trace objects of the current query.
+
+    Inside `query_trace_scope()` reads and writes go to a dict private to that
+    query, so concurrent queries (see 6-query_server.py) never mix traces.
+    Outside a scope they go to one module-level dict, as in a single CLI run.
+    """
+
+    def _current(self) -> dict:
+        return _query_trace_var.get(_default_query_trace)
+
+    def __getitem__(self, key):
+        return self._current()[key]
+
+    def __setitem__(self, key, value):
+        self._current()[key] = value
+
+    def __delitem__(self, key):
+        del self._current()[key]
+
+    def __iter__(self):
+        return iter(self._current())
+
+    def __len__(self):
+        return len(self._current())
+
+
+LAST_QUERY_TRACE = _QueryTrace()
+
+
+@contextmanager
+def query_trace_scope():
+    """Give the enclosed query (and the retrieval threads it starts) its own trace."""
+    token = _query_trace_var.set({"rag": None, "graph": None})
+    try:
+        yield LAST_QUERY_TRACE
+    finally:
+        _query_trace_var.reset(token)
+
+
 # Load environment variables
 load_dotenv()
 
@@ -60,32 +123,61 @@ logger = logging.getLogger(__name__)
 
 # Define paths
 VECTOR_STORE_DIR = project_root / "vector_store_outputs"
+EMBEDDING_MODEL_NAME = "google/embeddinggemma-300m"
 CHUNKING_OUTPUTS_DIR = project_root / "chunking_outputs"
 
+# RAG fusion: "rrf" (reciprocal-rank fusion) or "max" (best cosine similarity across subqueries),
+# cut to a global top-k and a token budget for the synthesis prompt.
+RAG_FUSION_METHOD = os.getenv("RAG_FUSION_METHOD", "rrf")
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
+RAG_TOKEN_BUDGET = int(os.getenv("RAG_TOKEN_BUDGET", "8000"))
+
+# Cypher plan cache: validated (row-returning) Cypher keyed by question + grounded entities + schema
+CYPHER_PLAN_CACHE_PATH = Path(
+    os.getenv(
+        "CYPHER_PLAN_CACHE_DB",
+        str(project_root / "knowledge_graph_outputs" / "cypher_plan_cache.sqlite"),
+    )
+)
+CYPHER_PLAN_CACHE_TTL_S = float(os.getenv("CYPHER_PLAN_CACHE_TTL_S", str(7 * 24 * 3600)))
 
-class EmbeddingGemmaWrapper(Embeddings):
-    """Wrapper for Google's EmbeddingGemma model via SentenceTransformers."""
+# Semantic answer cache (see utils/answer_cache.py)
+ANSWER_CACHE_PATH = VECTOR_STORE_DIR / "answer_cache.sqlite"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", str(24 * 3600)))
 
-    def __init__(self, model_name: str = "google/embeddinggemma-300m"):
-        self.model = SentenceTransformer(model_name)
+# Per-branch timeouts (seconds) when RAG and graph retrieval run concurrently
+RAG_TIMEOUT_S = float(os.getenv("RAG_TIMEOUT_S", "60"))
+GRAPH_TIMEOUT_S = float(os.getenv("GRAPH_TIMEOUT_S", "120"))
+# Threads shared by the rag/graph branches of all in-flight queries (2 per query).
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
 
-    def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        """Embed search docs."""
-        embeddings = self.model.encode(
-            texts,
-            prompt_name="document",
-            normalize_embeddings=True,
-        )
-        return embeddings.tolist()
-
-    def embed_query(self, text: str) -> list[float]:
-        """Embed query text."""
-        embedding = self.model.encode(
-            text,
-            prompt_name="query",
-            normalize_embeddings=True,
-        )
-        return embedding.tolist()
+# Upper bound on in-flight LLM calls (Groq rewrite, Cypher generation, synthesis)
+# across all queries in this process.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+llm_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+
+def build_chat_llm():
+    """Gemini chat model used for Cypher generation and answer synthesis."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash", temperature=0, convert_system_message_to_human=True
+    )
+
+
+_llm_lock = threading.Lock()
+
+
+def get_tools_llm():
+    """The process-wide chat LLM (`llm_for_tools`), created on first use."""
+    global llm_for_tools
+    if llm_for_tools is None:
+        with _llm_lock:
+            if llm_for_tools is None:
+                llm_for_tools = build_chat_llm()
+    return llm_for_tools
 
 
 def load_vector_store():
@@ -96,20 +188,20 @@ def load_vector_store():
             logger.error(f"Vector store not found at {index_path}")
             return None
 
+        from utils.embeddings import EmbeddingGemmaWrapper
+
         logger.info("Loading EmbeddingGemma model...")
-        embeddings = EmbeddingGemmaWrapper(model_name="google/embeddinggemma-300m")
+        embeddings = EmbeddingGemmaWrapper(model_name=EMBEDDING_MODEL_NAME)
 
         logger.info(f"Loading vector store from {index_path}...")
-        vector_store = FAISS.load_local(
-            str(index_path), embeddings, allow_dangerous_deserialization=True
-        )
+        vector_store = load_faiss_vector_store(index_path, embeddings)
         return vector_store
     except Exception as e:
         logger.error(f"Failed to load vector store: {e}")
         return None
 
 
-CYPHER_PROMPT = PromptTemplate(
+CYPHER_PROMPT = lazy_prompt_template(
     input_variables=[
         "schema",
         "query",
@@ -147,7 +239,7 @@ Generate Cypher only.
 )
 
 
-def resolve_entities(graph: Neo4jGraph, query: str, limit: int = 5):
+def resolve_entities(graph: "Neo4jGraph", query: str, limit: int = 5):
     """Resolve entity candidates from Neo4j using a full-text index."""
     cypher = """
     CALL db.index.fulltext.queryNodes(
@@ -171,7 +263,217 @@ def resolve_entities(graph: Neo4jGraph, query: str, limit: int = 5):
     return [r for r in (rows or []) if r.get("name")]
 
 
-@tool
+# Deterministic graph evidence for the grounded entities, fetched in ONE round-trip.
+# Each CALL block aggregates to exactly one row, so an empty block never drops the others.
+#   $a, $b              top two grounded concepts (either may be null)
+#   $concept_ids        concepts whose Image nodes are reported
+#   $names              grounded names for the subgraph capture
+#   $include_fallback   also run the fallback-only blocks (co-mention, shortestPath,
+#                       neighborhood); when false they return empty lists
+EVIDENCE_BUNDLE_CYPHER = """
+CALL {
+  MATCH (a:Concept {id:$a})-[r]-(b:Concept {id:$b})
+  WITH a, r, b
+  LIMIT 20
+  RETURN collect({a: a.id, rel: type(r), b: b.id}) AS direct
+}
+CALL {
+  MATCH (a:Concept {id:$a})<-[:MENTIONS]-(d:Document)-[:MENTIONS]->(b:Concept {id:$b})
+  WHERE $include_fallback AND d.source_type = 'chunk'
+  WITH d
+  LIMIT 10
+  RETURN collect({
+    source_id: d.source_id,
+    source_type: d.source_type,
+    chunk_file: d.chunk_file,
+    chunk_id: d.chunk_id,
+    chunk_index: d.chunk_index,
+    markdown_source: d.markdown_source
+  }) AS comention
+}
+CALL {
+  MATCH (a:Concept {id:$a})
+  MATCH (b:Concept {id:$b})
+  WHERE $include_fallback AND a <> b
+  MATCH p = shortestPath((a)-[*..4]-(b))
+  WITH p
+  LIMIT 5
+  RETURN collect(p) AS paths
+}
+CALL {
+  MATCH (a:Concept {id:$a})-[r]-(n)
+  WHERE $include_fallback
+  WITH r, n
+  LIMIT 25
+  RETURN collect({rel: type(r), n_labels: labels(n), n_id: n.id}) AS neighborhood
+}
+CALL {
+  UNWIND $concept_ids AS cid
+  MATCH (c:Concept {id: cid})
+  OPTIONAL MATCH (i1:Image)-[:DEPICTS]->(c)
+  OPTIONAL MATCH (c)<-[:MENTIONS]-(d:Document)-[:MENTIONS]->(i2:Image)
+  WITH cid,
+       collect(DISTINCT i1) + collect(DISTINCT i2) AS imgs
+  UNWIND imgs AS i
+  WITH cid, i
+  WHERE i IS NOT NULL
+  WITH cid, i, properties(i) AS p
+  WITH DISTINCT
+    i.id AS image_id,
+    coalesce(p.source_path, p.path) AS image_path,
+    cid AS related_concept
+  LIMIT $image_limit
+  RETURN collect({
+    image_id: image_id,
+    image_path: image_path,
+    related_concept: related_concept
+  }) AS images
+}
+CALL {
+  MATCH (n)
+  WHERE coalesce(n.id, n.text, n.name) IN $names
+  OPTIONAL MATCH (n)-[r]-(m)
+  WITH n, r, m
+  LIMIT $limit_rows
+  RETURN
+    collect(DISTINCT {
+      id: coalesce(n.id, n.text, n.name),
+      labels: labels(n),
+      properties: properties(n)
+    }) +
+    collect(DISTINCT CASE
+      WHEN m IS NULL THEN NULL
+      ELSE {
+        id: coalesce(m.id, m.text, m.name),
+        labels: labels(m),
+        properties: properties(m)
+      }
+    END) AS nodes,
+    collect(DISTINCT CASE
+      WHEN r IS NULL THEN NULL
+      ELSE {
+        source: coalesce(startNode(r).id, startNode(r).text, startNode(r).name),
+        type: type(r),
+        target: coalesce(endNode(r).id, endNode(r).text, endNode(r).name),
+        properties: properties(r)
+      }
+    END) AS edges
+}
+RETURN direct, comention, paths, neighborhood, images, nodes, edges
+"""
+
+
+_cypher_plan_cache = None
+_cypher_chains: dict["GraphClient", "GraphCypherQAChain"] = {}
+_cypher_chains_lock = threading.Lock()
+
+
+def get_cypher_plan_cache():
+    """In-memory LRU in front of a SQLite tier at CYPHER_PLAN_CACHE_PATH (shared across runs)."""
+    global _cypher_plan_cache
+    if _cypher_plan_cache is None:
+        _cypher_plan_cache = TieredCache(
+            LRUTTLCache(ttl_seconds=CYPHER_PLAN_CACHE_TTL_S),
+            SqliteTTLCache(CYPHER_PLAN_CACHE_PATH, ttl_seconds=CYPHER_PLAN_CACHE_TTL_S),
+        )
+    return _cypher_plan_cache
+
+
+def cypher_plan_key(query: str, entities: list[dict], schema: str) -> str:
+    """(normalized question, grounded entity set, schema hash) -> cache key."""
+    entity_set = sorted({e["name"] for e in entities if e.get("name")})
+    schema_hash = hashlib.sha256((schema or "").encode("utf-8")).hexdigest()
+    payload = json.dumps(
+        [normalize_query(query), entity_set, schema_hash], ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_cypher_chain(graph_client: "GraphClient") -> "GraphCypherQAChain":
+    """
+    Build the grounded GraphCypherQAChain once per (process-wide) graph client,
+    on the shared `get_tools_llm()` model, and reuse it.
+    """
+    chain = _cypher_chains.get(graph_client)
+    if chain is not None:
+        return chain
+    with _cypher_chains_lock:
+        chain = _cypher_chains.get(graph_client)
+        if chain is None:
+            from langchain_neo4j import GraphCypherQAChain
+
+            logger.info("Initializing grounded GraphCypherQAChain...")
+            # schema / entities / relationship types / hints are passed per call,
+            # so one chain serves every question.
+            chain = GraphCypherQAChain.from_llm(
+                llm=get_tools_llm(),
+                graph=graph_client.graph,
+                cypher_prompt=CYPHER_PROMPT.resolve(),
+                verbose=True,
+                return_intermediate_steps=True,
+                allow_dangerous_requests=True,
+            )
+            _cypher_chains[graph_client] = chain
+    return chain
+
+
+def fetch_evidence_bundle(
+    graph: "Neo4jGraph",
+    top2: list[str],
+    concept_ids_for_images: list[str],
+    grounded_names: list[str],
+    include_fallback: bool = False,
+    image_limit: int = 15,
+    limit_rows: int = 200,
+) -> dict:
+    """
+    Run EVIDENCE_BUNDLE_CYPHER and return its blocks as lists of row dicts, with
+    the same columns (and column order) as the former per-block queries.
+    "comention", "paths" and "neighborhood" are empty unless `include_fallback`.
+    """
+    a = top2[0] if top2 else None
+    b = top2[1] if len(top2) > 1 else None
+    rows = graph.query(
+        EVIDENCE_BUNDLE_CYPHER,
+        params={
+            "a": a,
+            "b": b,
+            "concept_ids": concept_ids_for_images,
+            "image_limit": image_limit,
+            "names": grounded_names,
+            "limit_rows": limit_rows,
+            "include_fallback": include_fallback,
+        },
+    )
+    row = (rows or [{}])[0] or {}
+
+    def _columns(maps, keys: tuple[str, ...]) -> list[dict]:
+        return [{k: m.get(k) for k in keys} for m in (maps or []) if m]
+
+    return {
+        "direct": _columns(row.get("direct"), ("a", "rel", "b")),
+        "comention": _columns(
+            row.get("comention"),
+            (
+                "source_id",
+                "source_type",
+                "chunk_file",
+                "chunk_id",
+                "chunk_index",
+                "markdown_source",
+            ),
+        ),
+        "paths": [{"p": p} for p in (row.get("paths") or [])],
+        "neighborhood": _columns(row.get("neighborhood"), ("rel", "n_labels", "n_id")),
+        "images": _columns(
+            row.get("images"), ("image_id", "image_path", "related_concept")
+        ),
+        "nodes": [n for n in (row.get("nodes") or []) if n],
+        "edges": [e for e in (row.get("edges") or []) if e],
+    }
+
+
+@lazy_tool
 def rag_retrieval_tool(query: str) -> str:
     """
     Performs RAG retrieval on the document vector store.
@@ -206,7 +508,8 @@ def rag_retrieval_tool(query: str) -> str:
 
     # 1. Generate optimized RAG subqueries using Groq-backed util
     try:
-        subqueries = generate_rag_subqueries(query)
+        with llm_slots:
+            subqueries = generate_rag_subqueries(query)
     except Exception as e:
         logger.error(
             "Failed to generate RAG subqueries, falling back to original query: %s", e
@@ -223,53 +526,66 @@ def rag_retrieval_tool(query: str) -> str:
     rag_trace["rewritten_or_decomposed_queries"] = list(subqueries)
 
     try:
-        # Use k=3 per subquery as requested
-        retriever = vector_store.as_retriever(search_kwargs={"k": 3})
+        # 2. Embed all subqueries in one batch and search FAISS once with the query matrix (k=3 per subquery)
+        k = rag_trace["k_per_subquery"]
+        query_vectors = vector_store.embedding_function.encode_queries(subqueries)
+        hits_per_subquery = search_by_vectors(vector_store, query_vectors, k)
+        docs_by_row = documents_for_rows(
+            vector_store, (row for hits in hits_per_subquery for row, _ in hits)
+        )
 
-        # 2. Run retrieval for each subquery and collect unique chunks
-        seen_keys: set[tuple] = set()
-        unique_docs = []
         retrieved_by_subquery: list[dict] = []
+        for sq, hits in zip(subqueries, hits_per_subquery):
+            logger.info("RAG retrieved %d documents for subquery '%s'", len(hits), sq)
+            retrieved_by_subquery.append(
+                {
+                    "subquery": sq,
+                    "hits": [
+                        {
+                            "chunk_id": docs_by_row[row].metadata.get("chunk_id", "unknown"),
+                            "source_file": docs_by_row[row].metadata.get("source_file", "unknown"),
+                            "faiss_id": row,
+                            "distance": distance,
+                        }
+                        for row, distance in hits
+                    ],
+                }
+            )
 
-        for sq in subqueries:
-            logger.info("RAG internal retrieval query: %s", sq)
-            docs = retriever.invoke(sq)
-
-            if not docs:
-                logger.info("RAG retrieved 0 documents for subquery: %s", sq)
-                continue
-
-            logger.info("RAG retrieved %d documents for subquery '%s'", len(docs), sq)
-            subquery_hits: list[dict] = []
-            for d in docs:
-                key = (
-                    d.metadata.get("source_file", ""),
-                    d.metadata.get("chunk_id", ""),
-                    d.page_content,
-                )
-                subquery_hits.append(
-                    {
-                        "chunk_id": d.metadata.get("chunk_id", "unknown"),
-                        "source_file": d.metadata.get("source_file", "unknown"),
-                    }
-                )
-                if key in seen_keys:
-                    continue
-                seen_keys.add(key)
-                unique_docs.append(d)
-
-            retrieved_by_subquery.append({"subquery": sq, "hits": subquery_hits})
+        # 3. Fuse per-subquery rankings (de-duplicated on FAISS ids), then keep a global
+        #    top-k that fits the token budget
+        fused = fuse_hits(hits_per_subquery, method=RAG_FUSION_METHOD)
+        selected = select_within_budget(
+            fused,
+            {row: d.page_content for row, d in docs_by_row.items()},
+            top_k=RAG_TOP_K,
+            token_budget=RAG_TOKEN_BUDGET,
+        )
+        unique_docs = [docs_by_row[row] for row, _, _ in selected]
+        rag_trace["fusion"] = {
+            "method": RAG_FUSION_METHOD,
+            "top_k": RAG_TOP_K,
+            "token_budget": RAG_TOKEN_BUDGET,
+            "num_candidates": len(fused),
+            "num_selected": len(selected),
+            "total_tokens": sum(tokens for _, _, tokens in selected),
+        }
 
-        # 3. Log each unique retrieved document with clear differentiation and metadata (no content)
         logger.info(
-            "Total unique documents after de-duplication across all subqueries: %d",
-            len(unique_docs),
+            "Fused %d unique candidates across all subqueries (%s); selected %d chunks, %d tokens",
+            len(fused),
+            RAG_FUSION_METHOD,
+            len(selected),
+            rag_trace["fusion"]["total_tokens"],
         )
-        if unique_docs:
-            for i, d in enumerate(unique_docs, start=1):
+        if selected:
+            for i, (row, score, tokens) in enumerate(selected, start=1):
+                d = docs_by_row[row]
                 logger.info(
-                    "RAG Unique Doc %d:\n  Source: %s\n  Chunk ID: %s\n  Metadata: %s",
+                    "RAG Doc %d (score=%.4f, tokens=%d):\n  Source: %s\n  Chunk ID: %s\n  Metadata: %s",
                     i,
+                    score,
+                    tokens,
                     d.metadata.get("source_file", "unknown"),
                     d.metadata.get("chunk_id", "unknown"),
                     {
@@ -281,7 +597,7 @@ def rag_retrieval_tool(query: str) -> str:
         else:
             logger.info("RAG retrieved 0 unique documents across all subqueries.")
 
-        # 4. Build result text over unique_docs
+        # 4. Build result text over the selected docs, best first
         result_text = "\n\n".join(
             [
                 f"Content: {d.page_content}\nSource: {d.metadata.get('source_file', 'unknown')}"
@@ -292,19 +608,23 @@ def rag_retrieval_tool(query: str) -> str:
         rag_trace["retrieved_by_subquery"] = retrieved_by_subquery
         rag_trace["retrieved_chunks"] = [
             {
-                "chunk_id": d.metadata.get("chunk_id", "unknown"),
-                "source_file": d.metadata.get("source_file", "unknown"),
-                "metadata": dict(d.metadata or {}),
-                "text": d.page_content,
+                "chunk_id": docs_by_row[row].metadata.get("chunk_id", "unknown"),
+                "source_file": docs_by_row[row].metadata.get("source_file", "unknown"),
+                "metadata": dict(docs_by_row[row].metadata or {}),
+                "text": docs_by_row[row].page_content,
+                "faiss_id": row,
+                "fused_score": score,
+                "rank": rank,
+                "tokens": tokens,
             }
-            for d in unique_docs
+            for rank, (row, score, tokens) in enumerate(selected, start=1)
         ]
         rag_trace["latency_ms"] = int((time.perf_counter() - t0) * 1000)
         LAST_QUERY_TRACE["rag"] = rag_trace
 
         # Log only metadata summary of the context returned to the LLM, not full content
         logger.info(
-            "RAG context returned to LLM (multi-subquery, k=3, deduplicated): "
+            "RAG context returned to LLM (multi-subquery, k=3, fused): "
             "num_chunks=%d, total_chars=%d",
             len(unique_docs),
             len(result_text),
@@ -320,7 +640,7 @@ def rag_retrieval_tool(query: str) -> str:
         return f"Error occurred during retrieval: {str(e)}"
 
 
-@tool
+@lazy_tool
 def graph_retrieval_tool(query: str) -> str:
     """
     Queries the knowledge graph database (Neo4j) using Cypher.
@@ -347,35 +667,11 @@ def graph_retrieval_tool(query: str) -> str:
     }
 
     try:
-        url = os.getenv("NEO4J_URI")
-        username = os.getenv("NEO4J_USERNAME")
-        password = os.getenv("NEO4J_PASSWORD")
-
-        logger.info(f"Connecting to Neo4j at {url}...")
-        graph = Neo4jGraph(url=url, username=username, password=password)
-
-        schema = graph.schema
-        # Relationship types from Neo4j (more robust than trying to parse schema text)
-        try:
-            rel_rows = graph.query(
-                "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType ORDER BY relationshipType"
-            )
-            relationship_types = ", ".join(
-                [
-                    r.get("relationshipType")
-                    for r in (rel_rows or [])
-                    if r.get("relationshipType")
-                ]
-            )
-        except Exception:
-            relationship_types = ""
-
-        # Use the shared LLM if available, otherwise create a local one
-        llm = llm_for_tools or ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0,
-            convert_system_message_to_human=True,
-        )
+        # Process-wide pooled client; schema + relationship types are cached (TTL / graph version)
+        graph_client = get_graph_client()
+        graph = graph_client.graph
+        schema = graph_client.schema
+        relationship_types = ", ".join(graph_client.relationship_types)
 
         # 1. Resolve entities FIRST
         logger.info("Resolving entities from graph for query: %s", query)
@@ -398,6 +694,18 @@ def graph_retrieval_tool(query: str) -> str:
             "Grounded entities to be provided to Cypher generator:\n%s", entity_str
         )
 
+        def _pick_top_concepts(resolved_entities: list[dict]) -> list[str]:
+            concept_ids: list[str] = []
+            for e in resolved_entities:
+                labels = e.get("labels") or []
+                if "Concept" in labels and e.get("name"):
+                    concept_ids.append(e["name"])
+            if len(concept_ids) >= 2:
+                return concept_ids[:2]
+            # Fallback: just use the first two names regardless of label
+            names = [e.get("name") for e in resolved_entities if e.get("name")]
+            return names[:2]
+
         # Provide hints to avoid brittle "semantic edge guessing". If there is no
         # direct Concept-Concept edge between the top two concepts, prefer co-mention
         # via Document or shortestPath queries that reflect how this KG is structured.
@@ -408,62 +716,25 @@ def graph_retrieval_tool(query: str) -> str:
                     out.append(e["name"])
             return out[:2]
 
+        top2 = _pick_top_concepts(entities)
+        grounded_names = [e.get("name") for e in entities if e.get("name")][:10]
+
+        # The hint is conditional rather than backed by a direct-edge lookup: the evidence
+        # bundle runs once, after Cypher generation, when it is known whether the
+        # fallback blocks are needed.
         cypher_hints = "- If uncertain, use simple MATCH patterns and LIMIT results."
         top2_for_hints = _top2_concepts_for_hints(entities)
         if len(top2_for_hints) == 2:
             a, b = top2_for_hints
-            try:
-                direct_count = graph.query(
-                    """
-                    MATCH (a:Concept {id:$a})-[r]-(b:Concept {id:$b})
-                    RETURN count(r) AS c
-                    """,
-                    params={"a": a, "b": b},
-                )
-                c = (direct_count or [{}])[0].get("c", 0)
-                if not c:
-                    cypher_hints = (
-                        f"- There may be NO direct edge between Concept '{a}' and Concept '{b}'.\n"
-                        "- Prefer evidence queries like:\n"
-                        "  MATCH (a:Concept {id:$a})<-[:MENTIONS]-(d:Document)-[:MENTIONS]->(b:Concept {id:$b})\n"
-                        "  WHERE d.source_type = 'chunk'\n"
-                        "  RETURN d.source_id, d.chunk_file, d.chunk_id, d.chunk_index LIMIT 10\n"
-                        "  or shortestPath((a)-[*..4]-(b))\n"
-                        "- Use the grounded entity ids literally."
-                    )
-            except Exception:
-                pass
-
-        # Image evidence helper: pull Image nodes + their paths connected to grounded concepts.
-        def _extract_image_paths_for_concepts(
-            concept_ids: list[str], limit: int = 10
-        ) -> list[dict]:
-            if not concept_ids:
-                return []
-            rows = graph.query(
-                """
-                UNWIND $concept_ids AS cid
-                MATCH (c:Concept {id: cid})
-                OPTIONAL MATCH (i1:Image)-[:DEPICTS]->(c)
-                OPTIONAL MATCH (c)<-[:MENTIONS]-(d:Document)-[:MENTIONS]->(i2:Image)
-                WITH cid,
-                     collect(DISTINCT i1) + collect(DISTINCT i2) AS imgs
-                UNWIND imgs AS i
-                WITH cid, i
-                WHERE i IS NOT NULL
-                WITH cid, i, properties(i) AS p
-                RETURN DISTINCT
-                  i.id AS image_id,
-                  coalesce(p.source_path, p.path) AS image_path,
-                  cid AS related_concept
-                LIMIT $limit
-                """,
-                params={"concept_ids": concept_ids, "limit": limit},
+            cypher_hints = (
+                f"- If there is NO direct edge between Concept '{a}' and Concept '{b}',\n"
+                "  prefer evidence queries like:\n"
+                "  MATCH (a:Concept {id:$a})<-[:MENTIONS]-(d:Document)-[:MENTIONS]->(b:Concept {id:$b})\n"
+                "  WHERE d.source_type = 'chunk'\n"
+                "  RETURN d.source_id, d.chunk_file, d.chunk_id, d.chunk_index LIMIT 10\n"
+                "  or shortestPath((a)-[*..4]-(b))\n"
+                "- Use the grounded entity ids literally."
             )
-            # Keep only rows with a path
-            return [
-                r for r in (rows or []) if r.get("image_id") and r.get("image_path")
-            ]
 
         # Chunk evidence helpers: resolve Document.source_id -> chunk in chunking_outputs/<chunk_filename>
         def _extract_strings_deep(obj):
@@ -509,27 +780,14 @@ def graph_retrieval_tool(query: str) -> str:
                 return None
             return chunk_filename, chunk_entry_id
 
+        chunk_store = get_chunk_store(CHUNKING_OUTPUTS_DIR)
+
         def _load_chunk_entry(chunk_filename: str, chunk_entry_id: str) -> dict | None:
-            chunk_path = CHUNKING_OUTPUTS_DIR / chunk_filename
-            if not chunk_path.exists():
-                return None
+            # O(1): id -> byte offset index, then a single seek + parse
             try:
-                import json
-
-                with open(chunk_path, "r", encoding="utf-8") as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        try:
-                            obj = json.loads(line)
-                        except Exception:
-                            continue
-                        if obj.get("id") == chunk_entry_id:
-                            return obj
+                return chunk_store.get(chunk_filename, chunk_entry_id)
             except Exception:
                 return None
-            return None
 
         def _extract_chunk_filenames_from_rows(rows: list[dict] | None) -> list[str]:
             """
@@ -557,66 +815,66 @@ def graph_retrieval_tool(query: str) -> str:
             chunk_filename: str, terms: list[str], limit: int = 5
         ) -> list[dict]:
             """
-            Best-effort: scan a chunk file and return chunk entries whose content mentions any term.
+            Best-effort: return chunk entries of a chunk file whose content mentions any term.
             Used when the graph returns a markdown Document that only points back to a chunk file
             (e.g., derived_from_chunk_file) but not a specific chunk id.
+            Candidates come from the chunk store's inverted index instead of a full file scan.
             """
             if not terms:
                 return []
-            chunk_path = CHUNKING_OUTPUTS_DIR / chunk_filename
-            if not chunk_path.exists():
-                return []
-            lowered_terms = [
-                t.lower() for t in terms if isinstance(t, str) and t.strip()
-            ]
-            if not lowered_terms:
-                return []
-            matches: list[dict] = []
             try:
-                import json
-
-                with open(chunk_path, "r", encoding="utf-8") as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        try:
-                            obj = json.loads(line)
-                        except Exception:
-                            continue
-                        content = obj.get("content", "")
-                        if not isinstance(content, str):
-                            continue
-                        hay = content.lower()
-                        if any(t in hay for t in lowered_terms):
-                            matches.append(obj)
-                            if len(matches) >= limit:
-                                break
+                return chunk_store.find_by_terms(chunk_filename, terms, limit=limit)
             except Exception:
                 return []
-            return matches
-
-        # 2. Build Cypher chain with constrained prompt
-        logger.info("Initializing grounded GraphCypherQAChain...")
-        chain = GraphCypherQAChain.from_llm(
-            llm=llm,
-            graph=graph,
-            cypher_prompt=CYPHER_PROMPT,
-            verbose=True,
-            return_intermediate_steps=True,
-            allow_dangerous_requests=True,
-        )
 
-        # 3. Invoke with grounded context
-        result = chain.invoke(
-            {
-                "query": query,
-                "entities": entity_str,
-                "schema": schema,
-                "relationship_types": relationship_types,
-                "cypher_hints": cypher_hints,
-            }
-        )
+        # 2. Reuse a validated Cypher plan for the same (question, entities, schema) if one
+        #    exists, skipping the generation LLM call; otherwise run the shared chain.
+        chain = get_cypher_chain(graph_client)
+        plan_cache = get_cypher_plan_cache()
+        plan_key = cypher_plan_key(query, entities, schema)
+        graph_trace["cypher_plan_cache_hit"] = False
+        result = None
+        cached_cypher = plan_cache.get(plan_key)
+        if cached_cypher:
+            try:
+                cached_rows = graph.query(cached_cypher)[: chain.top_k]
+            except Exception as e:
+                logger.warning("Cached Cypher plan failed, regenerating: %s", e)
+                cached_rows = []
+            if cached_rows:
+                logger.info("Cypher plan cache hit; skipped Cypher generation")
+                graph_trace["cypher_plan_cache_hit"] = True
+                result = {
+                    "result": "",
+                    "intermediate_steps": [
+                        {"query": cached_cypher},
+                        {"context": cached_rows},
+                    ],
+                }
+
+        if result is None:
+            # 3. Invoke with grounded context
+            with llm_slots:
+                result = chain.invoke(
+                    {
+                        "query": query,
+                        "entities": entity_str,
+                        "schema": schema,
+                        "relationship_types": relationship_types,
+                        "cypher_hints": cypher_hints,
+                    }
+                )
+            # Only Cypher that actually returned rows is worth replaying.
+            steps = result.get("intermediate_steps", [])
+            if (
+                len(steps) > 1
+                and steps[1].get("context")
+                and (steps[0].get("query") or "").strip()
+            ):
+                try:
+                    plan_cache.set(plan_key, steps[0]["query"])
+                except Exception as e:
+                    logger.warning("Failed to cache Cypher plan: %s", e)
 
         # Log intermediate Cypher + raw graph context
         steps = result.get("intermediate_steps", [])
@@ -648,18 +906,6 @@ def graph_retrieval_tool(query: str) -> str:
         # edges, so "semantic" relationships may not exist even when entities do.
         # If the LLM-generated Cypher returns no rows, fall back to deterministic
         # graph queries: direct edges, co-mention through documents, and short paths.
-        def _pick_top_concepts(resolved_entities: list[dict]) -> list[str]:
-            concept_ids: list[str] = []
-            for e in resolved_entities:
-                labels = e.get("labels") or []
-                if "Concept" in labels and e.get("name"):
-                    concept_ids.append(e["name"])
-            if len(concept_ids) >= 2:
-                return concept_ids[:2]
-            # Fallback: just use the first two names regardless of label
-            names = [e.get("name") for e in resolved_entities if e.get("name")]
-            return names[:2]
-
         def _format_rows(title: str, rows: list[dict]) -> str:
             if not rows:
                 return ""
@@ -731,88 +977,59 @@ def graph_retrieval_tool(query: str) -> str:
                 # Don't let sanitization errors break graph retrieval
                 pass
 
+        # Deterministic evidence for the grounded entities in a single round-trip: direct
+        # edges, images and the subgraph for the trace, plus co-mentions, shortest paths
+        # and the neighborhood only when the fallback below needs them.
+        evidence: dict = {}
+        try:
+            evidence_t0 = time.perf_counter()
+            evidence = fetch_evidence_bundle(
+                graph, top2, top2[:2], grounded_names, include_fallback=needs_fallback
+            )
+            graph_trace["evidence_bundle_ms"] = int(
+                (time.perf_counter() - evidence_t0) * 1000
+            )
+        except Exception as e:
+            logger.warning("Graph evidence bundle query failed: %s", e)
+
         if needs_fallback:
             logger.info(
                 "Graph retrieval returned empty context; running fallback queries..."
             )
             graph_trace["fallback_used"] = True
-            top2 = _pick_top_concepts(entities)
             fallback_parts: list[str] = []
 
             # (A) Direct edges between top concepts (any relationship type)
+            # (B) Co-mention evidence through documents (very common in your schema)
+            # (C) Short path (any relationships) to surface how nodes connect
             if len(top2) == 2:
-                a, b = top2
-                direct = graph.query(
-                    """
-                    MATCH (a:Concept {id:$a})-[r]-(b:Concept {id:$b})
-                    RETURN a.id AS a, type(r) AS rel, b.id AS b
-                    LIMIT 20
-                    """,
-                    params={"a": a, "b": b},
-                )
+                direct = evidence.get("direct") or []
                 fallback_parts.append(
                     _format_rows("Direct Concept-Concept edges", direct)
                 )
-                if direct:
-                    fallback_rows_all.extend(direct)
-
-                # (B) Co-mention evidence through documents (very common in your schema)
-                comention = graph.query(
-                    """
-                    MATCH (a:Concept {id:$a})<-[:MENTIONS]-(d:Document)-[:MENTIONS]->(b:Concept {id:$b})
-                    WHERE d.source_type = 'chunk'
-                    RETURN
-                      d.source_id AS source_id,
-                      d.source_type AS source_type,
-                      d.chunk_file AS chunk_file,
-                      d.chunk_id AS chunk_id,
-                      d.chunk_index AS chunk_index,
-                      d.markdown_source AS markdown_source
-                    LIMIT 10
-                    """,
-                    params={"a": a, "b": b},
-                )
+                fallback_rows_all.extend(direct)
+
+                comention = evidence.get("comention") or []
                 fallback_parts.append(
                     _format_rows("Co-mention via Document evidence", comention)
                 )
-                if comention:
-                    fallback_rows_for_sources.extend(comention)
-                    fallback_rows_all.extend(comention)
-
-                # (C) Short path (any relationships) to surface how nodes connect
-                path_rows = graph.query(
-                    """
-                    MATCH (a:Concept {id:$a})
-                    MATCH (b:Concept {id:$b})
-                    WITH a, b
-                    MATCH p = shortestPath((a)-[*..4]-(b))
-                    RETURN p
-                    LIMIT 5
-                    """,
-                    params={"a": a, "b": b},
-                )
+                fallback_rows_for_sources.extend(comention)
+                fallback_rows_all.extend(comention)
+
+                path_rows = evidence.get("paths") or []
                 fallback_parts.append(
                     _format_rows("Shortest paths (<=4 hops)", path_rows)
                 )
-                if path_rows:
-                    fallback_rows_all.extend(path_rows)
+                fallback_rows_all.extend(path_rows)
 
             # (D) Neighborhood expansion for the top grounded concept
             if top2:
                 a = top2[0]
-                neigh = graph.query(
-                    """
-                    MATCH (a:Concept {id:$a})-[r]-(n)
-                    RETURN type(r) AS rel, labels(n) AS n_labels, n.id AS n_id
-                    LIMIT 25
-                    """,
-                    params={"a": a},
-                )
+                neigh = evidence.get("neighborhood") or []
                 fallback_parts.append(
                     _format_rows(f"Neighborhood of Concept '{a}'", neigh)
                 )
-                if neigh:
-                    fallback_rows_all.extend(neigh)
+                fallback_rows_all.extend(neigh)
 
             fallback_text = "\n\n".join([p for p in fallback_parts if p])
             if fallback_text.strip():
@@ -829,10 +1046,12 @@ def graph_retrieval_tool(query: str) -> str:
         # Image path block (always append when images are found)
         # ---------------------------------------------------------------------
         try:
-            concept_ids_for_images = _pick_top_concepts(entities)[:2]
-            image_rows = _extract_image_paths_for_concepts(
-                concept_ids_for_images, limit=15
-            )
+            # Keep only rows with a path
+            image_rows = [
+                r
+                for r in (evidence.get("images") or [])
+                if r.get("image_id") and r.get("image_path")
+            ]
             if image_rows:
                 lines = []
                 for r in image_rows:
@@ -958,69 +1177,32 @@ def graph_retrieval_tool(query: str) -> str:
         # Retrieve a concrete subgraph (nodes + edges) around grounded entities
         # ---------------------------------------------------------------------
         try:
-            grounded_names = [e.get("name") for e in (entities or []) if e.get("name")][
-                :10
-            ]
+            # Captured by the evidence bundle query (no extra round-trip)
+            nodes = evidence.get("nodes") or []
+            edges = evidence.get("edges") or []
             if grounded_names:
-                subgraph_rows = graph.query(
-                    """
-                    MATCH (n)
-                    WHERE coalesce(n.id, n.text, n.name) IN $names
-                    OPTIONAL MATCH (n)-[r]-(m)
-                    WITH n, r, m
-                    LIMIT $limit_rows
-                    RETURN
-                      collect(DISTINCT {
-                        id: coalesce(n.id, n.text, n.name),
-                        labels: labels(n),
-                        properties: properties(n)
-                      }) +
-                      collect(DISTINCT CASE
-                        WHEN m IS NULL THEN NULL
-                        ELSE {
-                          id: coalesce(m.id, m.text, m.name),
-                          labels: labels(m),
-                          properties: properties(m)
-                        }
-                      END) AS nodes,
-                      collect(DISTINCT CASE
-                        WHEN r IS NULL THEN NULL
-                        ELSE {
-                          source: coalesce(startNode(r).id, startNode(r).text, startNode(r).name),
-                          type: type(r),
-                          target: coalesce(endNode(r).id, endNode(r).text, endNode(r).name),
-                          properties: properties(r)
-                        }
-                      END) AS edges
-                    """,
-                    params={"names": grounded_names, "limit_rows": 200},
-                )
-                if subgraph_rows:
-                    row0 = (subgraph_rows or [{}])[0] or {}
-                    nodes = [n for n in (row0.get("nodes") or []) if n]
-                    edges = [e for e in (row0.get("edges") or []) if e]
-                    # De-dupe nodes by id, preserve first-seen order.
-                    seen_n = set()
-                    uniq_nodes = []
-                    for n in nodes:
-                        nid = n.get("id")
-                        if not nid or nid in seen_n:
-                            continue
-                        seen_n.add(nid)
-                        uniq_nodes.append(n)
-                    # De-dupe edges by (source,type,target)
-                    seen_e = set()
-                    uniq_edges = []
-                    for e in edges:
-                        key = (e.get("source"), e.get("type"), e.get("target"))
-                        if key in seen_e:
-                            continue
-                        seen_e.add(key)
-                        uniq_edges.append(e)
-                    graph_trace["retrieved_subgraph"] = {
-                        "nodes": uniq_nodes,
-                        "edges": uniq_edges,
-                    }
+                # De-dupe nodes by id, preserve first-seen order.
+                seen_n = set()
+                uniq_nodes = []
+                for n in nodes:
+                    nid = n.get("id")
+                    if not nid or nid in seen_n:
+                        continue
+                    seen_n.add(nid)
+                    uniq_nodes.append(n)
+                # De-dupe edges by (source,type,target)
+                seen_e = set()
+                uniq_edges = []
+                for e in edges:
+                    key = (e.get("source"), e.get("type"), e.get("target"))
+                    if key in seen_e:
+                        continue
+                    seen_e.add(key)
+                    uniq_edges.append(e)
+                graph_trace["retrieved_subgraph"] = {
+                    "nodes": uniq_nodes,
+                    "edges": uniq_edges,
+                }
         except Exception:
             # Subgraph capture is best-effort; do not break answering.
             pass
@@ -1038,43 +1220,330 @@ def graph_retrieval_tool(query: str) -> str:
         return f"Error occurred during graph query: {str(e)}"
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Hybrid RAG Query Agent")
-    parser.add_argument(
-        "query", nargs="?", default="what is attention?", help="The query to answer."
+_retrieval_executor: ThreadPoolExecutor | None = None
+
+
+def run_retrievals_concurrently(
+    query: str,
+    rag_timeout: float = RAG_TIMEOUT_S,
+    graph_timeout: float = GRAPH_TIMEOUT_S,
+) -> tuple[str, int, str, int]:
+    """
+    Run rag_retrieval_tool (Groq rewrite + FAISS) and graph_retrieval_tool
+    (Neo4j entity grounding + Cypher) in parallel threads.
+
+    Each branch has its own timeout; a branch that times out or raises yields an
+    error string (and an error in LAST_QUERY_TRACE) instead of failing the query.
+
+    Returns:
+        (rag_result, rag_ms, graph_result, graph_ms)
+    """
+    global _retrieval_executor
+    if _retrieval_executor is None:
+        # Extra workers so a timed-out branch that is still running cannot starve the next query.
+        _retrieval_executor = ThreadPoolExecutor(
+            max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval"
+        )
+
+    def _timed(tool_fn):
+        t0 = time.perf_counter()
+        result = tool_fn.invoke(query)
+        return result, int((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    logger.info("Invoking RAG and Graph retrieval tools concurrently...")
+    # Each branch runs in a copy of the caller's context so tool traces land in
+    # the caller's query_trace_scope().
+    futures = {
+        "rag": (
+            _retrieval_executor.submit(
+                contextvars.copy_context().run, _timed, rag_retrieval_tool
+            ),
+            rag_timeout,
+        ),
+        "graph": (
+            _retrieval_executor.submit(
+                contextvars.copy_context().run, _timed, graph_retrieval_tool
+            ),
+            graph_timeout,
+        ),
+    }
+
+    results: dict[str, tuple[str, int]] = {}
+    for branch, (future, timeout) in futures.items():
+        remaining = max(0.0, timeout - (time.perf_counter() - t0))
+        try:
+            results[branch] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            future.cancel()
+            logger.error("%s retrieval timed out after %.1fs", branch, timeout)
+            LAST_QUERY_TRACE[branch] = {
+                "query": query,
+                "error": f"timed out after {timeout:.1f}s",
+                "latency_ms": int(timeout * 1000),
+            }
+            results[branch] = (
+                f"Error: {branch} retrieval timed out after {timeout:.1f}s",
+                int(timeout * 1000),
+            )
+        except Exception as e:
+            logger.error("%s retrieval failed: %s", branch, e, exc_info=True)
+            results[branch] = (
+                f"Error: {str(e)}",
+                int((time.perf_counter() - t0) * 1000),
+            )
+
+    logger.info(
+        "Retrieval finished in %d ms (rag=%d ms, graph=%d ms)",
+        int((time.perf_counter() - t0) * 1000),
+        results["rag"][1],
+        results["graph"][1],
     )
-    args = parser.parse_args()
+    return results["rag"][0], results["rag"][1], results["graph"][0], results["graph"][1]
 
-    global llm_for_tools, vector_store
 
-    # Initialize LLM for final answer synthesis and tool usage
-    llm_for_tools = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash", temperature=0, convert_system_message_to_human=True
+_trace_file_lock = threading.Lock()
+
+
+def write_query_trace(trace_record: dict, echo: bool = True) -> None:
+    """Append the per-query JSON trace to logs/query_traces.jsonl, log it, and print it (if echo)."""
+    trace_path = logs_dir / "query_traces.jsonl"
+    with _trace_file_lock, open(trace_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(trace_record, ensure_ascii=False) + "\n")
+
+    logger.info(
+        "QUERY_TRACE_JSON %s",
+        json.dumps(trace_record, ensure_ascii=False),
     )
 
-    # Initialize vector store once
-    logger.info("Initializing resources...")
-    vector_store = load_vector_store()
+    if echo:
+        print("\n=== Query Trace (JSON) ===\n")
+        print(json.dumps(trace_record, ensure_ascii=False, indent=2))
+
+
+def _message_text(chunk) -> str:
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            part if isinstance(part, str) else str(part.get("text", ""))
+            for part in content
+            if isinstance(part, (str, dict))
+        )
+    return ""
+
+
+def stream_synthesis(llm, prompt: str, strip_headers: tuple[str, ...] = (), out=sys.stdout):
+    """
+    Stream the synthesis answer to `out` (None: don't print) as the LLM produces it.
+
+    Text is released line by line so that a section starting with any of
+    `strip_headers` (the header, its following non-empty lines and one blank
+    separator) is dropped before it is printed.
+
+    Returns:
+        (message, text, ttft_ms): the merged message chunks (for token usage),
+        the printed text, and the ms until the first non-empty chunk arrived.
+    """
+    t0 = time.perf_counter()
+    ttft_ms = None
+    message = None
+    printed: list[str] = []
+    pending = ""
+    skipping = False
+
+    def _emit(line: str) -> None:
+        nonlocal skipping
+        if skipping:
+            # Skip the section body, then its blank separator.
+            if line.strip() == "":
+                skipping = False
+            return
+        if strip_headers and any(line.strip().startswith(h) for h in strip_headers):
+            skipping = True
+            return
+        printed.append(line)
+        if out is not None:
+            out.write(line)
+            out.flush()
+
+    with llm_slots:
+        for chunk in llm.stream(prompt):
+            message = chunk if message is None else message + chunk
+            text = _message_text(chunk)
+            if not text:
+                continue
+            if ttft_ms is None:
+                ttft_ms = int((time.perf_counter() - t0) * 1000)
+            pending += text
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                _emit(line + "\n")
+    if pending:
+        _emit(pending)
+    if out is not None:
+        out.write("\n")
+        out.flush()
+    return message, "".join(printed).strip(), ttft_ms
+
+
+_answer_cache: SemanticAnswerCache | None = None
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache(
+            ANSWER_CACHE_PATH,
+            threshold=ANSWER_CACHE_THRESHOLD,
+            ttl_seconds=ANSWER_CACHE_TTL_S,
+        )
+    return _answer_cache
+
+
+def answer_cache_versions() -> tuple[str, str, str]:
+    """(embedding model, vector index version, graph version) an answer is valid for."""
+    return (
+        EMBEDDING_MODEL_NAME,
+        index_version(VECTOR_STORE_DIR / "index"),
+        graph_version(),
+    )
+
+
+def lookup_exact_cached_answer(query: str):
+    """
+    Look `query` up in the answer cache by normalized text. This needs neither
+    the embedding model nor the vector store, so it runs before they load.
+
+    Returns (record, similarity, cached_question) or None.
+    """
+    try:
+        return get_answer_cache().lookup_exact(
+            query, *answer_cache_versions(), normalize=normalize_query
+        )
+    except Exception as e:
+        logger.warning("Answer cache unavailable: %s", e)
+        return None
+
+
+def lookup_cached_answer(query: str):
+    """
+    Check the semantic answer cache for `query`.
+
+    Returns:
+        (cache, query_embedding, versions, hit) where hit is
+        (record, similarity, cached_question) or None. cache is None when the
+        vector store (needed for the query embedding) is unavailable or the
+        lookup failed.
+    """
     if not vector_store:
-        logger.warning("Vector store could not be loaded. RAG tool will fail.")
+        return None, None, None, None
+    try:
+        cache = get_answer_cache()
+        versions = answer_cache_versions()
+        query_embedding = vector_store.embedding_function.embed_query(query)
+        return cache, query_embedding, versions, cache.lookup(query_embedding, *versions)
+    except Exception as e:
+        logger.warning("Answer cache unavailable: %s", e)
+        return None, None, None, None
+
+
+def init_resources() -> None:
+    """Create the synthesis LLM and load the vector store (no-op if already done)."""
+    global vector_store
+
+    # Initialize LLM for final answer synthesis and tool usage
+    get_tools_llm()
+
+    # Initialize vector store once
+    if vector_store is None:
+        logger.info("Initializing resources...")
+        vector_store = load_vector_store()
+        if not vector_store:
+            logger.warning("Vector store could not be loaded. RAG tool will fail.")
+
+
+def answer_query(query: str, use_cache: bool = True, echo: bool = True) -> dict:
+    """
+    Answer `query` end to end: semantic answer cache, concurrent RAG + graph
+    retrieval, streamed synthesis. Returns the query's trace record.
+
+    With echo=False nothing is printed to stdout (used by 6-query_server.py).
+    Raises if synthesis fails. The LLM and vector store are loaded on demand
+    (`init_resources()`), after the exact-text answer cache lookup.
+    """
+    with query_trace_scope():
+        return _answer_query(query, use_cache, echo)
+
+
+def _cached_answer_trace(query: str, hit, total_t0: float, echo: bool) -> dict:
+    """Print (if echo) and log a cached answer; return its trace record."""
+    cached_record, similarity, cached_question = hit
+    logger.info(
+        "Answer cache hit (similarity=%.4f, cached question: %s)",
+        similarity,
+        cached_question,
+    )
+    final_text = cached_record.get("final_answer", "")
+    logger.info("Final Answer: %s", final_text)
+    if echo:
+        print("\n=== Final Answer ===\n")
+        print(final_text)
 
+    trace_record = {
+        **cached_record,
+        "run_id": str(uuid.uuid4()),
+        "timestamp_utc": datetime.now(timezone.utc).isoformat(),
+        "user_question": query,
+        "token_usage": None,
+        "latency_ms": {
+            "rag": 0,
+            "graph": 0,
+            "synthesis": 0,
+            "total": int((time.perf_counter() - total_t0) * 1000),
+        },
+        "answer_cache": {
+            "hit": True,
+            "similarity": similarity,
+            "cached_question": cached_question,
+            "cached_run_id": cached_record.get("run_id"),
+        },
+    }
+    try:
+        write_query_trace(trace_record, echo=echo)
+    except Exception as e:
+        logger.warning("Failed to write structured query trace: %s", e)
+    return trace_record
+
+
+def _answer_query(query: str, use_cache: bool, echo: bool) -> dict:
     # Log the original user query clearly
-    logger.info("User query received: %s", args.query)
-    logger.info("Starting Query Agent with query: '%s'", args.query)
+    logger.info("User query received: %s", query)
+    logger.info("Starting Query Agent with query: '%s'", query)
 
     total_t0 = time.perf_counter()
 
-    # 1) Always call RAG tool
-    logger.info("Invoking RAG retrieval tool...")
-    rag_t0 = time.perf_counter()
-    rag_result = rag_retrieval_tool.invoke(args.query)
-    rag_ms = int((time.perf_counter() - rag_t0) * 1000)
+    # 0) Answer cache. An exact (normalized) repeat is answered before any model is
+    #    loaded; otherwise a near-identical question answered against the same
+    #    index + graph versions returns the stored answer without retrieval or LLM calls.
+    answer_cache = query_embedding = cache_versions = None
+    if use_cache:
+        hit = lookup_exact_cached_answer(query)
+        if hit:
+            return _cached_answer_trace(query, hit, total_t0, echo)
+
+    init_resources()
+
+    if use_cache:
+        answer_cache, query_embedding, cache_versions, hit = lookup_cached_answer(
+            query
+        )
+        if hit:
+            return _cached_answer_trace(query, hit, total_t0, echo)
 
-    # 2) Always call Graph tool
-    logger.info("Invoking Graph retrieval tool...")
-    graph_t0 = time.perf_counter()
-    graph_result = graph_retrieval_tool.invoke(args.query)
-    graph_ms = int((time.perf_counter() - graph_t0) * 1000)
+    # 1) + 2) Always call both RAG and Graph tools, concurrently
+    rag_result, rag_ms, graph_result, graph_ms = run_retrievals_concurrently(query)
 
     # 3) Synthesize final answer using both contexts
     synthesis_prompt = f"""
@@ -1084,7 +1553,7 @@ You are a helpful AI assistant that must answer user questions by combining two
 2. GRAPH CONTEXT (Neo4j knowledge graph)
 
 User question:
-{args.query}
+{query}
 
 --- TEXT CONTEXT (from rag_retrieval_tool) ---
 {rag_result}
@@ -1108,12 +1577,23 @@ Provide a clear, concise answer to the user's question.
 
     logger.info("Synthesizing final answer from RAG and Graph contexts...")
     try:
+        # The answer is streamed as it is generated. A "Chunks used" block is only
+        # allowed when the graph context resolved chunks; otherwise it is filtered
+        # out of the stream before it is printed.
+        graph_has_chunks = (
+            "Chunks (resolved from Document.source_id):" in graph_result
+            or "Chunks (inferred from derived_from_chunk_file):" in graph_result
+        )
+        if echo:
+            print("\n=== Final Answer ===\n")
         synth_t0 = time.perf_counter()
-        final_msg = llm_for_tools.invoke(synthesis_prompt)
-        synth_ms = int((time.perf_counter() - synth_t0) * 1000)
-        final_text = (
-            final_msg.content if isinstance(final_msg, str) else final_msg.content
+        final_msg, final_text, ttft_ms = stream_synthesis(
+            llm_for_tools,
+            synthesis_prompt,
+            strip_headers=() if graph_has_chunks else ("**Chunks used:**", "Chunks used:"),
+            out=sys.stdout if echo else None,
         )
+        synth_ms = int((time.perf_counter() - synth_t0) * 1000)
 
         def _deep_find_ints(obj, keys: set[str]) -> dict:
             found: dict = {}
@@ -1147,6 +1627,8 @@ Provide a clear, concise answer to the user's question.
                     getattr(msg, "additional_kwargs"), dict
                 ):
                     meta.update(getattr(msg, "additional_kwargs") or {})
+                if isinstance(getattr(msg, "usage_metadata", None), dict):
+                    meta["usage_metadata"] = msg.usage_metadata
 
                 token_keys = {
                     "input_tokens",
@@ -1164,29 +1646,6 @@ Provide a clear, concise answer to the user's question.
         # -----------------------------------------------------------------
         # Deterministic post-processing (avoid hallucinated "chunks used")
         # -----------------------------------------------------------------
-        def _strip_section(text: str, header_starts: tuple[str, ...]) -> str:
-            """
-            Remove a section that starts with any header in header_starts and
-            continues until the next blank line.
-            """
-            lines = text.splitlines()
-            out: list[str] = []
-            i = 0
-            while i < len(lines):
-                line = lines[i]
-                if any(line.strip().startswith(h) for h in header_starts):
-                    # skip header line + following non-empty lines
-                    i += 1
-                    while i < len(lines) and lines[i].strip() != "":
-                        i += 1
-                    # also skip the blank separator if present
-                    if i < len(lines) and lines[i].strip() == "":
-                        i += 1
-                    continue
-                out.append(line)
-                i += 1
-            return "\n".join(out).strip()
-
         def _extract_image_paths_from_graph_context(
             graph_text: str,
         ) -> list[tuple[str, str]]:
@@ -1234,93 +1693,100 @@ Provide a clear, concise answer to the user's question.
                     uniq.append(s)
             return uniq
 
-        # Strip "Chunks used" if the graph context doesn't contain resolved chunks.
-        if (
-            "Chunks (resolved from Document.source_id):" not in graph_result
-            and "Chunks (inferred from derived_from_chunk_file):" not in graph_result
-        ):
-            final_text = _strip_section(
-                final_text,
-                (
-                    "**Chunks used:**",
-                    "Chunks used:",
-                ),
-            )
-
-        # Ensure deterministic image paths section when graph provides images.
+        # Deterministic blocks are appended after the streamed answer.
+        appendix = ""
         img_pairs = _extract_image_paths_from_graph_context(graph_result)
         if img_pairs and "Image paths" not in final_text:
-            final_text = (
-                final_text.strip()
-                + "\n\nImage paths:\n"
-                + "\n".join(
-                    [f"- {img_id}: {img_path}" for img_id, img_path in img_pairs]
-                )
+            appendix += "\n\nImage paths:\n" + "\n".join(
+                [f"- {img_id}: {img_path}" for img_id, img_path in img_pairs]
             )
 
-        # Ensure deterministic chunks section when graph provides resolved chunks.
         chunk_sids = _extract_chunk_source_ids_from_graph_context(graph_result)
         if chunk_sids and "Chunks used" not in final_text:
-            final_text = (
-                final_text.strip()
-                + "\n\nChunks used:\n"
-                + "\n".join([f"- {sid}" for sid in chunk_sids])
+            appendix += "\n\nChunks used:\n" + "\n".join(
+                [f"- {sid}" for sid in chunk_sids]
             )
 
+        if appendix:
+            if echo:
+                print(appendix[1:])
+            final_text = final_text + appendix
         logger.info("Final Answer: %s", final_text)
-        print("\n=== Final Answer ===\n")
-        print(final_text)
 
         # -----------------------------------------------------------------
         # Structured per-query log (JSON) after the final answer
         # -----------------------------------------------------------------
+        trace_record = {
+            "run_id": str(uuid.uuid4()),
+            "timestamp_utc": datetime.now(timezone.utc).isoformat(),
+            "user_question": query,
+            "rewritten_or_decomposed_queries": (
+                (LAST_QUERY_TRACE.get("rag") or {}).get(
+                    "rewritten_or_decomposed_queries", []
+                )
+            ),
+            "retrieved_chunks": (LAST_QUERY_TRACE.get("rag") or {}).get(
+                "retrieved_chunks", []
+            ),
+            "retrieved_graph_subgraph": (
+                (LAST_QUERY_TRACE.get("graph") or {}).get(
+                    "retrieved_subgraph", {"nodes": [], "edges": []}
+                )
+            ),
+            "final_answer": final_text,
+            "token_usage": _extract_token_usage(final_msg),
+            "latency_ms": {
+                "rag": rag_ms,
+                "graph": graph_ms,
+                "synthesis": synth_ms,
+                "time_to_first_token": ttft_ms,
+                "total": int((time.perf_counter() - total_t0) * 1000),
+            },
+            "internal": {
+                "rag": LAST_QUERY_TRACE.get("rag"),
+                "graph": LAST_QUERY_TRACE.get("graph"),
+            },
+            "answer_cache": {"hit": False, "enabled": answer_cache is not None},
+        }
+
         try:
-            trace_record = {
-                "run_id": str(uuid.uuid4()),
-                "timestamp_utc": datetime.now(timezone.utc).isoformat(),
-                "user_question": args.query,
-                "rewritten_or_decomposed_queries": (
-                    (LAST_QUERY_TRACE.get("rag") or {}).get(
-                        "rewritten_or_decomposed_queries", []
-                    )
-                ),
-                "retrieved_chunks": (LAST_QUERY_TRACE.get("rag") or {}).get(
-                    "retrieved_chunks", []
-                ),
-                "retrieved_graph_subgraph": (
-                    (LAST_QUERY_TRACE.get("graph") or {}).get(
-                        "retrieved_subgraph", {"nodes": [], "edges": []}
-                    )
-                ),
-                "final_answer": final_text,
-                "token_usage": _extract_token_usage(final_msg),
-                "latency_ms": {
-                    "rag": rag_ms,
-                    "graph": graph_ms,
-                    "synthesis": synth_ms,
-                    "total": int((time.perf_counter() - total_t0) * 1000),
-                },
-                "internal": {
-                    "rag": LAST_QUERY_TRACE.get("rag"),
-                    "graph": LAST_QUERY_TRACE.get("graph"),
-                },
-            }
+            write_query_trace(trace_record, echo=echo)
+        except Exception as e:
+            logger.warning("Failed to write structured query trace: %s", e)
+
+        # Cache the answer only when both retrieval branches succeeded.
+        if (
+            answer_cache
+            and not (LAST_QUERY_TRACE.get("rag") or {}).get("error")
+            and not (LAST_QUERY_TRACE.get("graph") or {}).get("error")
+        ):
+            try:
+                answer_cache.store(
+                    query, query_embedding, *cache_versions, trace_record
+                )
+            except Exception as e:
+                logger.warning("Failed to store answer in cache: %s", e)
+        return trace_record
+    except Exception:
+        logger.exception("Final answer synthesis failed.")
+        raise
 
-            trace_path = logs_dir / "query_traces.jsonl"
-            with open(trace_path, "a", encoding="utf-8") as f:
-                f.write(json.dumps(trace_record, ensure_ascii=False) + "\n")
 
-            logger.info(
-                "QUERY_TRACE_JSON %s",
-                json.dumps(trace_record, ensure_ascii=False),
-            )
+def main():
+    parser = argparse.ArgumentParser(description="Hybrid RAG Query Agent")
+    parser.add_argument(
+        "query", nargs="?", default="what is attention?", help="The query to answer."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the semantic answer cache (always run retrieval + synthesis).",
+    )
+    args = parser.parse_args()
 
-            print("\n=== Query Trace (JSON) ===\n")
-            print(json.dumps(trace_record, ensure_ascii=False, indent=2))
-        except Exception as e:
-            logger.warning("Failed to write structured query trace: %s", e)
+    try:
+        answer_query(args.query, use_cache=not args.no_cache)
     except Exception as e:
-        logger.exception("Final answer synthesis failed.")
         print("Error during final answer synthesis:", e)
 
 
@@ -0,0 +1,380 @@
+import sys
+import os
+import argparse
+import asyncio
+import logging
+import json
+import time
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Add project root to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+load_dotenv()
+
+QUERY_SERVER_HOST = os.getenv("QUERY_SERVER_HOST", "127.0.0.1")
+QUERY_SERVER_PORT = int(os.getenv("QUERY_SERVER_PORT", "8080"))
+# Queries answered at the same time; further requests wait in the queue.
+QUERY_SERVER_WORKERS = int(os.getenv("QUERY_SERVER_WORKERS", "4"))
+# Requests waiting beyond this are rejected with 503 instead of piling up.
+QUERY_SERVER_QUEUE_SIZE = int(os.getenv("QUERY_SERVER_QUEUE_SIZE", "64"))
+MAX_BODY_BYTES = 64 * 1024
+
+# The query agent configures logging (stdout + logs/query_agent_logs.txt) on import.
+# Import it via importlib (file name starts with a number).
+query_agent_path = project_root / "agents" / "6-query_agent.py"
+spec = importlib.util.spec_from_file_location("query_agent", query_agent_path)
+query_agent = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(query_agent)
+
+logger = logging.getLogger("query_server")
+
+# Latency buckets in seconds (Prometheus-style, cumulative on export).
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+LATENCY_STAGES = ("queue_wait", "rag", "graph", "synthesis", "time_to_first_token", "total")
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram rendered in Prometheus text format."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+            else:
+                self._counts[-1] += 1
+            self._sum += value
+
+    def render(self, name: str, labels: str) -> list[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {total_sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class ServerMetrics:
+    """Request counters, queue gauges and per-stage latency histograms."""
+
+    def __init__(self):
+        self.latency = {stage: Histogram() for stage in LATENCY_STAGES}
+        self.requests: dict[str, int] = {}
+        self.answer_cache_hits = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def count(self, status: str) -> None:
+        with self._lock:
+            self.requests[status] = self.requests.get(status, 0) + 1
+
+    def observe_trace(self, trace_record: dict, queue_wait_s: float) -> None:
+        self.latency["queue_wait"].observe(queue_wait_s)
+        for stage, ms in (trace_record.get("latency_ms") or {}).items():
+            if stage in self.latency and isinstance(ms, (int, float)):
+                self.latency[stage].observe(ms / 1000.0)
+        if (trace_record.get("answer_cache") or {}).get("hit"):
+            with self._lock:
+                self.answer_cache_hits += 1
+
+    def render(self, queue_depth: int) -> str:
+        lines = [
+            "# HELP query_latency_seconds Per-stage latency of answered queries.",
+            "# TYPE query_latency_seconds histogram",
+        ]
+        for stage, histogram in self.latency.items():
+            lines.extend(histogram.render("query_latency_seconds", f'stage="{stage}"'))
+        with self._lock:
+            requests = dict(self.requests)
+            cache_hits = self.answer_cache_hits
+            in_flight = self.in_flight
+        lines += [
+            "# HELP query_requests_total Query requests by outcome.",
+            "# TYPE query_requests_total counter",
+        ]
+        for status, n in sorted(requests.items()):
+            lines.append(f'query_requests_total{{status="{status}"}} {n}')
+        lines += [
+            "# HELP answer_cache_hits_total Queries answered from the semantic answer cache.",
+            "# TYPE answer_cache_hits_total counter",
+            f"answer_cache_hits_total {cache_hits}",
+            "# HELP query_queue_depth Requests waiting for a worker.",
+            "# TYPE query_queue_depth gauge",
+            f"query_queue_depth {queue_depth}",
+            "# HELP query_in_flight Queries currently being answered.",
+            "# TYPE query_in_flight gauge",
+            f"query_in_flight {in_flight}",
+            "# HELP llm_max_concurrency Upper bound on concurrent LLM calls.",
+            "# TYPE llm_max_concurrency gauge",
+            f"llm_max_concurrency {query_agent.LLM_MAX_CONCURRENCY}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class QueryServer:
+    """
+    Minimal asyncio HTTP/1.1 server around the hybrid query agent.
+
+    Requests are put on a bounded asyncio.Queue and answered by
+    `workers` tasks, each running `query_agent.answer_query` in a thread
+    (the agent is synchronous). Concurrent LLM calls across all queries are
+    capped by the agent's `llm_slots` semaphore (LLM_MAX_CONCURRENCY).
+
+        POST /query    {"query": "...", "no_cache": false} -> answer + trace
+        GET  /health   liveness
+        GET  /metrics  Prometheus text format
+    """
+
+    def __init__(
+        self,
+        host: str = QUERY_SERVER_HOST,
+        port: int = QUERY_SERVER_PORT,
+        workers: int = QUERY_SERVER_WORKERS,
+        queue_size: int = QUERY_SERVER_QUEUE_SIZE,
+    ):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.queue: asyncio.Queue | None = None
+        self.queue_size = queue_size
+        self.metrics = ServerMetrics()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="query"
+        )
+
+    # ------------------------------------------------------------------
+    # Startup
+    # ------------------------------------------------------------------
+    def warm_up(self) -> None:
+        """Load the LLM, vector store (and embedding model) and Neo4j schema once."""
+        t0 = time.perf_counter()
+        query_agent.init_resources()
+        if query_agent.vector_store:
+            # Loads the embedding model weights before the first request.
+            query_agent.vector_store.embedding_function.embed_query("warm up")
+        try:
+            query_agent.get_graph_client().schema
+        except Exception as e:
+            logger.warning("Neo4j warm-up failed (graph retrieval will retry): %s", e)
+        logger.info("Resources ready in %d ms", int((time.perf_counter() - t0) * 1000))
+
+    async def serve(self) -> None:
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        worker_tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info(
+            "Query server listening on http://%s:%d (workers=%d, queue=%d, llm_max_concurrency=%d)",
+            self.host,
+            self.port,
+            self.workers,
+            self.queue_size,
+            query_agent.LLM_MAX_CONCURRENCY,
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in worker_tasks:
+                task.cancel()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Queue workers
+    # ------------------------------------------------------------------
+    async def _worker(self, worker_id: int) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            query, use_cache, enqueued_at, future = await self.queue.get()
+            queue_wait_s = time.perf_counter() - enqueued_at
+            try:
+                if future.cancelled():
+                    continue
+                self.metrics.in_flight += 1
+                try:
+                    trace_record = await loop.run_in_executor(
+                        self._executor, query_agent.answer_query, query, use_cache, False
+                    )
+                finally:
+                    self.metrics.in_flight -= 1
+                self.metrics.observe_trace(trace_record, queue_wait_s)
+                if not future.done():
+                    future.set_result(trace_record)
+            except Exception as e:
+                logger.error("Worker %d failed on query %r: %s", worker_id, query, e)
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            request_line = await reader.readline()
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2:
+                return
+            method, path = parts[0].upper(), parts[1].split("?", 1)[0]
+
+            headers: dict[str, str] = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length") or 0)
+            if length > MAX_BODY_BYTES:
+                await self._respond(writer, 413, {"error": "request body too large"})
+                return
+            body = await reader.readexactly(length) if length else b""
+
+            if method == "GET" and path == "/health":
+                await self._respond(writer, 200, {"status": "ok"})
+            elif method == "GET" and path == "/metrics":
+                await self._respond_text(
+                    writer,
+                    200,
+                    self.metrics.render(self.queue.qsize()),
+                    "text/plain; version=0.0.4",
+                )
+            elif method == "POST" and path == "/query":
+                await self._handle_query(writer, body)
+            else:
+                await self._respond(writer, 404, {"error": f"no route for {method} {path}"})
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+            logger.warning("Dropping malformed request: %s", e)
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _handle_query(self, writer: asyncio.StreamWriter, body: bytes) -> None:
+        try:
+            payload = json.loads(body or b"{}")
+            query = (payload.get("query") or "").strip()
+        except (ValueError, AttributeError):
+            query = ""
+            payload = {}
+        if not query:
+            self.metrics.count("bad_request")
+            await self._respond(writer, 400, {"error": 'expected JSON body {"query": "..."}'})
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait(
+                (query, not payload.get("no_cache", False), time.perf_counter(), future)
+            )
+        except asyncio.QueueFull:
+            self.metrics.count("rejected")
+            await self._respond(writer, 503, {"error": "query queue is full, retry later"})
+            return
+
+        try:
+            trace_record = await future
+        except Exception as e:
+            self.metrics.count("error")
+            await self._respond(writer, 500, {"error": str(e)})
+            return
+
+        self.metrics.count("ok")
+        await self._respond(
+            writer,
+            200,
+            {
+                "answer": trace_record.get("final_answer", ""),
+                "run_id": trace_record.get("run_id"),
+                "trace": trace_record,
+            },
+        )
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: dict) -> None:
+        await self._respond_text(
+            writer,
+            status,
+            json.dumps(payload, ensure_ascii=False),
+            "application/json; charset=utf-8",
+        )
+
+    async def _respond_text(
+        self, writer: asyncio.StreamWriter, status: int, text: str, content_type: str
+    ) -> None:
+        reasons = {
+            200: "OK",
+            400: "Bad Request",
+            404: "Not Found",
+            413: "Payload Too Large",
+            500: "Internal Server Error",
+            503: "Service Unavailable",
+        }
+        body = text.encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP server for the Hybrid RAG Query Agent")
+    parser.add_argument("--host", default=QUERY_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=QUERY_SERVER_PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=QUERY_SERVER_WORKERS,
+        help="Queries answered concurrently.",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=QUERY_SERVER_QUEUE_SIZE,
+        help="Max waiting requests before new ones get 503.",
+    )
+    args = parser.parse_args()
+
+    # Each in-flight query runs its rag + graph branches on the shared retrieval pool.
+    query_agent.RETRIEVAL_WORKERS = max(query_agent.RETRIEVAL_WORKERS, 2 * args.workers)
+
+    server = QueryServer(args.host, args.port, args.workers, args.queue_size)
+    server.warm_up()
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        logger.info("Query server stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,12 @@
 '''https://github.com/Utsav-J/chunking_strategies'''
 import re
 import os
+import argparse
 import logging
 import json
 import datetime
+from collections import deque
 import numpy as np
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
-from sklearn.metrics.pairwise import cosine_similarity
-import matplotlib.pyplot as plt
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,20 +17,34 @@ logger = logging.getLogger(__name__)
 model_name = "sentence-transformers/all-mpnet-base-v2"
 model_kwargs = {"device": "cpu"}
 encode_kwargs = {"normalize_embeddings": False}
+# Windowed sentences sent to the embedding model per embed_documents() call.
+embed_batch_size = int(os.getenv("SEMANTIC_CHUNKING_EMBED_BATCH_SIZE", "256"))
 
-embedding_model = HuggingFaceEmbeddings(
-    model_name=model_name,
-    model_kwargs=model_kwargs,
-    encode_kwargs=encode_kwargs,
-)
+_embedding_model = None
+
+
+def get_embedding_model():
+    """Load the HuggingFace embedding model on first use rather than at import time."""
+    global _embedding_model
+    if _embedding_model is None:
+        from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+
+        _embedding_model = HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs=model_kwargs,
+            encode_kwargs=encode_kwargs,
+        )
+    return _embedding_model
 
 root_dir = os.path.dirname(os.path.dirname(__file__))
 markdown_output_dir = os.path.join(root_dir,"markdown_outputs")
 default_file_path = os.path.join(markdown_output_dir,"book_cleaned.md")
 
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.?!])\s+')
+
 def split_sentences(text:str):
     # splitting the essay on '.', '?', and '!'
-    single_sentences_list = re.split(r'(?<=[.?!])\s+', text)
+    single_sentences_list = SENTENCE_SPLIT_RE.split(text)
     logger.info(f"%d sentences were found", len(single_sentences_list))
     sentences = [{'sentence': x, 'index' : i} for i, x in enumerate(single_sentences_list)]
     # [
@@ -41,49 +54,61 @@ def split_sentences(text:str):
     return sentences
 
 def combine_sentences(sentences, buffer_size=1):
+    texts = [s["sentence"] for s in sentences]
+    n = len(texts)
     for i, item in enumerate(sentences):
-        # slice indices with buffer on both sides
-        start = max(0, i - buffer_size)
-        end = min(len(sentences), i + buffer_size + 1)
-
-        # join all sentence strings in the window
-        combined = " ".join(s["sentence"] for s in sentences[start:end])
-
-        # store result
-        item["combined_sentence"] = combined
+        # join the window with buffer_size sentences on both sides
+        item["combined_sentence"] = " ".join(texts[max(0, i - buffer_size):min(n, i + buffer_size + 1)])
 
     return sentences
 
-def embed_text(text_parts:list[dict]):
-    embeddings = embedding_model.embed_documents([x['combined_sentence'] for x in text_parts])
+def embed_texts(texts: list[str], batch_size: int = embed_batch_size) -> np.ndarray:
+    """Embed `texts` in batches into one (len(texts), dim) float matrix."""
+    model = get_embedding_model()
+    batches = []
+    for start in range(0, len(texts), batch_size):
+        batches.append(np.asarray(model.embed_documents(texts[start:start + batch_size]), dtype=np.float64))
+        logger.debug("Embedded %d/%d windows", min(start + batch_size, len(texts)), len(texts))
+    if not batches:
+        return np.empty((0, 0), dtype=np.float64)
+    return np.vstack(batches)
+
+def embed_text(text_parts:list[dict], batch_size: int = embed_batch_size):
+    embeddings = embed_texts([x['combined_sentence'] for x in text_parts], batch_size=batch_size)
     for i, sentence in enumerate(text_parts):
         sentence['combined_sentence_embedding'] = embeddings[i]
     return text_parts
 
-def calculate_cosine_distances(sentences):
-    distances = []
-    for i in range(len(sentences) - 1):
-        embedding_current = sentences[i]['combined_sentence_embedding']
-        embedding_next = sentences[i + 1]['combined_sentence_embedding']
-
-        # Calculate cosine similarity
-        similarity = cosine_similarity([embedding_current], [embedding_next])[0][0] #type:ignore
-
-        # Convert to cosine distance
-        distance = 1 - similarity
-
-        # Append cosine distance to the list
-        distances.append(distance)
+def adjacent_cosine_distances(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Cosine distance between each row and the next: normalize once, then a
+    row-wise dot product of the matrix with itself shifted by one row.
+    Zero vectors get similarity 0 (distance 1), as with sklearn's cosine_similarity.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float64)
+    if len(matrix) < 2:
+        return np.empty(0, dtype=np.float64)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    unit = matrix / norms
+    return 1.0 - np.einsum("ij,ij->i", unit[:-1], unit[1:])
 
-        # Store distance in the dictionary
-        sentences[i]['distance_to_next'] = distance
+def calculate_cosine_distances(sentences):
+    if not sentences:
+        return [], sentences
+    distances = adjacent_cosine_distances(
+        np.stack([s['combined_sentence_embedding'] for s in sentences])
+    ).tolist()
 
-    # Optionally handle the last sentence
-    # sentences[-1]['distance_to_next'] = None  # or a default value
+    # Store each distance on the sentence it starts from (the last sentence has none)
+    for sentence, distance in zip(sentences, distances):
+        sentence['distance_to_next'] = distance
 
     return distances, sentences
 
 def visualize_semantic_chunk_similarities(distances: list, output_dir: str | None = None, filename: str | None = None):
+    import matplotlib.pyplot as plt
+
     plt.plot(distances)
 
     y_upper_bound = 0.2
@@ -195,6 +220,22 @@ def combine_sentences_into_chunks(sentences,indices_above_threshold):
         logger.info("\n")
     return chunks
 
+def chunk_record(source_filepath, index: int, chunk: str, embedding=None) -> dict:
+    base = os.path.splitext(os.path.basename(source_filepath))[0]
+    item = {
+        "id": f"{base}_chunk_{index}",
+        "source": os.path.basename(source_filepath),
+        "source_path": source_filepath,
+        "chunk_index": index,
+        "text": chunk,
+        "char_count": len(chunk),
+        "word_count": len(chunk.split()),
+        "created_at": datetime.datetime.utcnow().isoformat() + "Z",
+    }
+    if embedding is not None:
+        item["embedding"] = embedding
+    return item
+
 def save_chunks_jsonl(chunks, source_filepath, output_dir: str | None = None, filename: str | None = None, include_embeddings: bool = False):
     if output_dir is None:
         output_dir = os.path.join(root_dir, "chunking_outputs")
@@ -210,26 +251,14 @@ def save_chunks_jsonl(chunks, source_filepath, output_dir: str | None = None, fi
     embeddings = None
     if include_embeddings:
         try:
-            embeddings = embedding_model.embed_documents(chunks)
+            embeddings = get_embedding_model().embed_documents(chunks)
         except Exception:
             logger.exception("Failed to compute embeddings for chunks; continuing without embeddings")
             embeddings = [None] * len(chunks)
 
     with open(path, "w", encoding="utf-8") as fh:
         for i, chunk in enumerate(chunks):
-            item = {
-                "id": f"{base}_chunk_{i}",
-                "source": os.path.basename(source_filepath),
-                "source_path": source_filepath,
-                "chunk_index": i,
-                "text": chunk,
-                "char_count": len(chunk),
-                "word_count": len(chunk.split()),
-                "created_at": datetime.datetime.utcnow().isoformat() + "Z",
-            }
-            if embeddings is not None:
-                item["embedding"] = embeddings[i]
-
+            item = chunk_record(source_filepath, i, chunk, embeddings[i] if embeddings is not None else None)
             fh.write(json.dumps(item, ensure_ascii=False) + "\n")
 
     logger.info("Saved %d chunks to %s (embeddings=%s)", len(chunks), path, include_embeddings)
@@ -283,10 +312,234 @@ def semantic_chunking(
     return chunks
 
 
-if __name__ == "__main__":
-    chunks = semantic_chunking(
+# ---------------------------------------------------------------------------
+# Streaming mode: constant memory for documents of any size
+# ---------------------------------------------------------------------------
+
+def iter_sentences(filepath: str, read_size: int = 1 << 20):
+    """
+    Yield the same sentences as `split_sentences(open(filepath).read())`, reading
+    `read_size` characters at a time and keeping only the unfinished tail.
+    """
+    carry = ""
+    strip_next = False
+    read_any = False
+    with open(filepath, "r", encoding="utf-8") as fh:
+        while True:
+            block = fh.read(read_size)
+            if not block:
+                break
+            read_any = True
+            if strip_next:
+                # The previous block ended inside the whitespace run of a split.
+                block = block.lstrip()
+                if not block:
+                    continue
+                strip_next = False
+            parts = SENTENCE_SPLIT_RE.split(carry + block)
+            carry = parts.pop()
+            yield from parts
+            strip_next = bool(parts) and carry == ""
+    if read_any:
+        yield carry
+
+def iter_windows(sentences, buffer_size: int = 1):
+    """
+    Yield (sentence, combined_sentence) with the same windows as
+    `combine_sentences`, holding at most 2 * buffer_size + 1 sentences.
+    """
+    window: deque[tuple[int, str]] = deque()
+    n = 0
+    for sentence in sentences:
+        window.append((n, sentence))
+        n += 1
+        center = n - 1 - buffer_size
+        if center >= 0:
+            yield window[center - window[0][0]][1], " ".join(s for _, s in window)
+            if len(window) > 2 * buffer_size:
+                window.popleft()
+    # trailing sentences have a truncated right-hand window
+    for center in range(max(0, n - buffer_size), n):
+        yield (
+            window[center - window[0][0]][1],
+            " ".join(s for i, s in window if i >= center - buffer_size),
+        )
 
+class RunningPercentile:
+    """
+    Approximate percentile of a stream of cosine distances (range [0, 2]) from a
+    fixed-bin histogram: O(bins) memory, error below one bin width (2 / bins).
+    """
+
+    def __init__(self, bins: int = 4000, upper: float = 2.0):
+        self.upper = upper
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.count = 0
+
+    def add(self, values) -> None:
+        values = np.clip(np.atleast_1d(np.asarray(values, dtype=np.float64)), 0.0, self.upper)
+        idx = np.minimum((values / self.upper * len(self.counts)).astype(np.int64), len(self.counts) - 1)
+        np.add.at(self.counts, idx, 1)
+        self.count += len(values)
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return float("inf")
+        # rank as in numpy's default (linear) method, located inside its bin
+        rank = q / 100.0 * (self.count - 1)
+        cumulative = np.cumsum(self.counts)
+        b = int(np.searchsorted(cumulative, rank, side="right"))
+        below = cumulative[b - 1] if b > 0 else 0
+        width = self.upper / len(self.counts)
+        return (b + (rank - below + 0.5) / self.counts[b]) * width
+
+def semantic_chunking_stream(
+    filepath: str = default_file_path,
+    include_embeddings: bool = False,
+    chunks_output_dir: str | None = None,
+    buffer_size: int = 1,
+    breakpoint_percentile_threshold: float = 95,
+    warmup_distances: int = 2000,
+    max_chunk_sentences: int = 500,
+    batch_size: int = embed_batch_size,
+):
+    """
+    Semantic chunking with bounded memory, writing chunks to JSONL as they close.
+
+    Sentences are read incrementally (`iter_sentences`) and embedded in
+    windows of `batch_size`. A chunk closes after a sentence whose distance
+    to the next one exceeds the running `breakpoint_percentile_threshold`
+    percentile (`RunningPercentile`), or once it reaches `max_chunk_sentences`.
+    The first `warmup_distances` distances are buffered and split with their
+    exact percentile, so documents up to that size chunk exactly like
+    `semantic_chunking()`. No similarity plot is produced in this mode.
+
+    Returns (jsonl_path, chunk_count).
+    """
+    logger.info("Streaming file: %s", filepath)
+    output_dir = chunks_output_dir or os.path.join(root_dir, "chunking_outputs")
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(filepath))[0]
+    timestamp = datetime.datetime.now(datetime.UTC).strftime("%Y%m%dT%H%M%SZ")
+    partial_path = os.path.join(output_dir, f"{base}_chunks_{timestamp}.jsonl.partial")
+
+    percentile = RunningPercentile()
+    warmup: list[tuple[str, float]] = []
+    warmed_up = False
+    current: list[str] = []
+    to_write: list[str] = []
+    chunk_count = 0
+
+    def write_chunks(fh) -> None:
+        nonlocal chunk_count
+        if not to_write:
+            return
+        embeddings = None
+        if include_embeddings:
+            try:
+                embeddings = get_embedding_model().embed_documents(to_write)
+            except Exception:
+                logger.exception("Failed to compute embeddings for chunks; continuing without embeddings")
+        for i, chunk in enumerate(to_write):
+            item = chunk_record(filepath, chunk_count, chunk, embeddings[i] if embeddings else None)
+            fh.write(json.dumps(item, ensure_ascii=False) + "\n")
+            chunk_count += 1
+        to_write.clear()
+        fh.flush()
+
+    def close_chunk(fh) -> None:
+        if current:
+            to_write.append(" ".join(current))
+            current.clear()
+        if len(to_write) >= 32:
+            write_chunks(fh)
+
+    def place(fh, sentence: str, distance: float | None, threshold: float) -> None:
+        current.append(sentence)
+        if (distance is not None and distance > threshold) or len(current) >= max_chunk_sentences:
+            close_chunk(fh)
+
+    def flush_warmup(fh) -> None:
+        threshold = float(np.percentile([d for _, d in warmup], breakpoint_percentile_threshold)) if warmup else float("inf")
+        for sentence, distance in warmup:
+            place(fh, sentence, distance, threshold)
+        warmup.clear()
+
+    def handle(fh, sentence: str, distance: float | None) -> None:
+        nonlocal warmed_up
+        if distance is None:
+            # last sentence of the document
+            if not warmed_up:
+                flush_warmup(fh)
+            place(fh, sentence, None, float("inf"))
+            return
+        percentile.add(distance)
+        if not warmed_up:
+            warmup.append((sentence, distance))
+            if len(warmup) >= warmup_distances:
+                flush_warmup(fh)
+                warmed_up = True
+            return
+        place(fh, sentence, distance, percentile.percentile(breakpoint_percentile_threshold))
+
+    prev_sentence = None
+    prev_embedding = None
+    batch: list[tuple[str, str]] = []
+
+    def process_batch(fh) -> None:
+        nonlocal prev_sentence, prev_embedding
+        if not batch:
+            return
+        embeddings = embed_texts([window for _, window in batch], batch_size=batch_size)
+        sentences = [sentence for sentence, _ in batch]
+        if prev_embedding is not None:
+            embeddings = np.vstack([prev_embedding, embeddings])
+            sentences = [prev_sentence] + sentences
+        for sentence, distance in zip(sentences, adjacent_cosine_distances(embeddings).tolist()):
+            handle(fh, sentence, distance)
+        prev_sentence, prev_embedding = sentences[-1], embeddings[-1]
+        batch.clear()
+
+    with open(partial_path, "w", encoding="utf-8") as fh:
+        for sentence, window in iter_windows(iter_sentences(filepath), buffer_size):
+            batch.append((sentence, window))
+            if len(batch) >= batch_size:
+                process_batch(fh)
+        process_batch(fh)
+        if prev_sentence is not None:
+            handle(fh, prev_sentence, None)
+        close_chunk(fh)
+        write_chunks(fh)
+
+    output_path = os.path.join(output_dir, f"{base}_chunks_{chunk_count}_{timestamp}.jsonl")
+    os.replace(partial_path, output_path)
+    logger.info(
+        "Streamed %d chunks to %s (approx. %.0fth percentile distance %.4f over %d distances)",
+        chunk_count,
+        output_path,
+        breakpoint_percentile_threshold,
+        percentile.percentile(breakpoint_percentile_threshold),
+        percentile.count,
+    )
+    return output_path, chunk_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Semantic chunking of a markdown file.")
+    parser.add_argument("filepath", nargs="?", default=default_file_path, help="Markdown file to chunk.")
+    parser.add_argument("--include-embeddings", action="store_true", help="Store chunk embeddings in the JSONL.")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Constant-memory mode: read, embed and write chunks incrementally (no plot).",
     )
-    logger.info("%d chunks were formed", len(chunks))
-    for i in range(len(chunks)):
-        logger.info("Chunk #%d : %d", i, len(chunks[i]))
+    args = parser.parse_args()
+
+    if args.stream:
+        output_path, chunk_count = semantic_chunking_stream(args.filepath, include_embeddings=args.include_embeddings)
+        logger.info("%d chunks were formed", chunk_count)
+    else:
+        chunks = semantic_chunking(args.filepath, include_embeddings=args.include_embeddings)
+        logger.info("%d chunks were formed", len(chunks))
+        for i in range(len(chunks)):
+            logger.info("Chunk #%d : %d", i, len(chunks[i]))
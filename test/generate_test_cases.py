@@ -86,27 +86,10 @@ def process_single_query(query: str, category: Optional[str] = None) -> Dict[str
 
     total_t0 = time.perf_counter()
 
-    # 1) Call RAG tool
-    logger.info("Invoking RAG retrieval tool...")
-    rag_t0 = time.perf_counter()
-    try:
-        rag_result = rag_retrieval_tool.invoke(query)
-        rag_ms = int((time.perf_counter() - rag_t0) * 1000)
-    except Exception as e:
-        logger.error(f"RAG retrieval failed: {e}")
-        rag_result = f"Error: {str(e)}"
-        rag_ms = 0
-
-    # 2) Call Graph tool
-    logger.info("Invoking Graph retrieval tool...")
-    graph_t0 = time.perf_counter()
-    try:
-        graph_result = graph_retrieval_tool.invoke(query)
-        graph_ms = int((time.perf_counter() - graph_t0) * 1000)
-    except Exception as e:
-        logger.error(f"Graph retrieval failed: {e}")
-        graph_result = f"Error: {str(e)}"
-        graph_ms = 0
+    # 1) + 2) Call RAG and Graph tools concurrently (per-branch timeouts; errors come back as strings)
+    rag_result, rag_ms, graph_result, graph_ms = query_agent.run_retrievals_concurrently(
+        query
+    )
 
     # 3) Synthesize final answer
     synthesis_prompt = f"""
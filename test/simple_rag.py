@@ -37,11 +37,11 @@ test_dir = Path(__file__).resolve().parent
 sys.path.append(str(project_root))
 sys.path.append(str(test_dir))
 
-from langchain_community.vectorstores import FAISS
-from langchain_core.embeddings import Embeddings
-from sentence_transformers import SentenceTransformer
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+from utils.embeddings import EmbeddingGemmaWrapper
+from utils.vector_store import load_faiss_vector_store
+
 # Import CSV utilities
 from csv_questions_utils import load_questions
 
@@ -63,31 +63,6 @@ vector_store = None
 llm = None
 
 
-class EmbeddingGemmaWrapper(Embeddings):
-    """Wrapper for Google's EmbeddingGemma model via SentenceTransformers."""
-
-    def __init__(self, model_name: str = "google/embeddinggemma-300m"):
-        self.model = SentenceTransformer(model_name)
-
-    def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        """Embed search docs."""
-        embeddings = self.model.encode(
-            texts,
-            prompt_name="document",
-            normalize_embeddings=True,
-        )
-        return embeddings.tolist()
-
-    def embed_query(self, text: str) -> list[float]:
-        """Embed query text."""
-        embedding = self.model.encode(
-            text,
-            prompt_name="query",
-            normalize_embeddings=True,
-        )
-        return embedding.tolist()
-
-
 def load_vector_store():
     """Loads the existing FAISS vector store from disk."""
     try:
@@ -100,9 +75,7 @@ def load_vector_store():
         embeddings = EmbeddingGemmaWrapper(model_name="google/embeddinggemma-300m")
 
         logger.info(f"Loading vector store from {index_path}...")
-        vector_store = FAISS.load_local(
-            str(index_path), embeddings, allow_dangerous_deserialization=True
-        )
+        vector_store = load_faiss_vector_store(index_path, embeddings)
         logger.info("Vector store loaded successfully")
         return vector_store
     except Exception as e:
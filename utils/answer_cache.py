@@ -0,0 +1,165 @@
+"""
+Semantic cache of end-to-end query answers.
+
+Each entry stores the question, its normalized query embedding, the final
+answer record (answer + trace), and the versions it was computed against:
+the embedding model, the vector index (`utils.vector_store.index_version`)
+and the graph (`utils.graph_client.graph_version`). A lookup returns the most
+similar stored question whose cosine similarity is at least `threshold`. Only
+entries computed against the current versions qualify. Entries for other
+versions, or older than `ttl_seconds`, are deleted during the lookup.
+
+`lookup_exact` matches the question text itself (after `normalize`) and needs
+no embedding, so a repeated question can be answered before the embedding
+model is even loaded.
+"""
+
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+class SemanticAnswerCache:
+    """SQLite-backed answer cache matched by query-embedding cosine similarity."""
+
+    def __init__(
+        self,
+        db_path: Path,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        ttl_seconds: float | None = DEFAULT_TTL_SECONDS,
+    ):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                index_version TEXT NOT NULL,
+                graph_version TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                embedding BLOB NOT NULL,
+                record TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def _purge_stale(self, model_name: str, index_version: str, graph_version: str) -> None:
+        cutoff = time.time() - self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._conn:
+            cur = self._conn.execute(
+                """
+                DELETE FROM answers
+                WHERE (model_name = ? AND (index_version != ? OR graph_version != ?))
+                   OR (? IS NOT NULL AND created_at < ?)
+                """,
+                (model_name, index_version, graph_version, cutoff, cutoff),
+            )
+        if cur.rowcount:
+            logger.info(f"Answer cache: dropped {cur.rowcount} stale entries")
+
+    def lookup(
+        self,
+        embedding: np.ndarray,
+        model_name: str,
+        index_version: str,
+        graph_version: str,
+    ) -> tuple[dict, float, str] | None:
+        """Return (record, similarity, cached_question) for the best hit, or None."""
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        with self._lock:
+            self._purge_stale(model_name, index_version, graph_version)
+            rows = self._conn.execute(
+                """
+                SELECT question, embedding, record FROM answers
+                WHERE model_name = ? AND index_version = ? AND graph_version = ?
+                """,
+                (model_name, index_version, graph_version),
+            ).fetchall()
+
+        rows = [r for r in rows if len(r[1]) == query.nbytes]
+        if not rows:
+            return None
+        matrix = np.stack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+        sims = matrix @ query
+        best = int(np.argmax(sims))
+        similarity = float(sims[best])
+        if similarity < self.threshold:
+            logger.info(
+                f"Answer cache miss (best similarity {similarity:.4f} < {self.threshold})"
+            )
+            return None
+        question, _, record = rows[best]
+        return json.loads(record), similarity, question
+
+    def lookup_exact(
+        self,
+        question: str,
+        model_name: str,
+        index_version: str,
+        graph_version: str,
+        normalize: Callable[[str], str] = str.strip,
+    ) -> tuple[dict, float, str] | None:
+        """Return (record, 1.0, cached_question) for the newest entry whose normalized question matches."""
+        key = normalize(question)
+        with self._lock:
+            self._purge_stale(model_name, index_version, graph_version)
+            rows = self._conn.execute(
+                """
+                SELECT question, record FROM answers
+                WHERE model_name = ? AND index_version = ? AND graph_version = ?
+                ORDER BY created_at DESC
+                """,
+                (model_name, index_version, graph_version),
+            ).fetchall()
+        for cached_question, record in rows:
+            if normalize(cached_question) == key:
+                return json.loads(record), 1.0, cached_question
+        return None
+
+    def store(
+        self,
+        question: str,
+        embedding: np.ndarray,
+        model_name: str,
+        index_version: str,
+        graph_version: str,
+        record: dict,
+    ) -> None:
+        blob = np.asarray(embedding, dtype=np.float32).ravel().tobytes()
+        payload = json.dumps(record, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO answers
+                    (question, model_name, index_version, graph_version, created_at, embedding, record)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (question, model_name, index_version, graph_version, time.time(), blob, payload),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM answers")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,260 @@
+"""
+Random-access lookups into `chunking_outputs/*.jsonl` chunk files.
+
+For every chunk file, one sequential pass builds:
+
+    offsets   chunk id -> (byte offset, byte length) of its JSONL line
+    postings  lowercase word -> ordinals of the lines whose content contains it
+
+The index is kept in memory and persisted under `<chunks_dir>/.index/<file>.json`.
+It is rebuilt when the JSONL file's size or mtime changes. A chunk lookup is
+then a single seek + json.loads, and term matching only parses the candidate
+lines picked from the posting lists. Substring terms are resolved against
+the vocabulary through an in-memory n-gram index (built on first use), so a
+term costs a few set intersections rather than a pass over every word.
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIRNAME = ".index"
+INDEX_FORMAT_VERSION = 1
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Vocabulary words are indexed by every n-gram of length 1..VOCAB_GRAM.
+VOCAB_GRAM = 3
+
+_stores: dict[Path, "ChunkStore"] = {}
+_stores_lock = threading.Lock()
+
+
+def _words(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+class _FileIndex:
+    def __init__(
+        self,
+        size: int,
+        mtime_ns: int,
+        offsets: dict,
+        line_offsets: list,
+        postings: dict,
+    ):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.offsets: dict[str, tuple[int, int]] = offsets
+        self.line_offsets: list[tuple[int, int]] = line_offsets
+        self.postings: dict[str, list[int]] = postings
+        self._vocab_grams: dict[str, set[str]] | None = None
+
+    def _grams(self) -> dict[str, set[str]]:
+        if self._vocab_grams is None:
+            grams: dict[str, set[str]] = {}
+            for word in self.postings:
+                for n in range(1, VOCAB_GRAM + 1):
+                    for i in range(len(word) - n + 1):
+                        grams.setdefault(word[i : i + n], set()).add(word)
+            self._vocab_grams = grams
+        return self._vocab_grams
+
+    def words_containing(self, fragment: str) -> list[str]:
+        """Indexed words that contain `fragment` (itself included, if indexed)."""
+        grams = self._grams()
+        n = min(VOCAB_GRAM, len(fragment))
+        candidates: set[str] | None = None
+        for i in range(len(fragment) - n + 1):
+            words = grams.get(fragment[i : i + n])
+            if not words:
+                return []
+            candidates = set(words) if candidates is None else candidates & words
+        return [w for w in candidates or () if fragment in w]
+
+    def to_json(self) -> dict:
+        return {
+            "format": INDEX_FORMAT_VERSION,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "offsets": self.offsets,
+            "line_offsets": self.line_offsets,
+            "postings": self.postings,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "_FileIndex":
+        return cls(
+            size=data["size"],
+            mtime_ns=data["mtime_ns"],
+            offsets={k: tuple(v) for k, v in data["offsets"].items()},
+            line_offsets=[tuple(v) for v in data["line_offsets"]],
+            postings=data["postings"],
+        )
+
+
+class ChunkStore:
+    """Indexed, read-only access to the chunk JSONL files in one directory."""
+
+    def __init__(self, chunks_dir: Path):
+        self.chunks_dir = Path(chunks_dir)
+        self.index_dir = self.chunks_dir / INDEX_DIRNAME
+        self._indexes: dict[str, _FileIndex] = {}
+        self._lock = threading.Lock()
+
+    def _index_path(self, chunk_filename: str) -> Path:
+        return self.index_dir / f"{chunk_filename}.json"
+
+    def _build(self, chunk_path: Path, size: int, mtime_ns: int) -> _FileIndex:
+        offsets: dict[str, tuple[int, int]] = {}
+        line_offsets: list[tuple[int, int]] = []
+        postings: dict[str, list[int]] = {}
+
+        with open(chunk_path, "rb") as f:
+            pos = 0
+            for raw in f:
+                start, pos = pos, pos + len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except Exception:
+                    continue
+                ordinal = len(line_offsets)
+                line_offsets.append((start, len(raw)))
+                chunk_id = obj.get("id")
+                # First occurrence wins, matching a top-to-bottom scan.
+                if isinstance(chunk_id, str) and chunk_id not in offsets:
+                    offsets[chunk_id] = (start, len(raw))
+                content = obj.get("content", "")
+                if isinstance(content, str):
+                    for word in set(_words(content)):
+                        postings.setdefault(word, []).append(ordinal)
+
+        return _FileIndex(size, mtime_ns, offsets, line_offsets, postings)
+
+    def _get_index(self, chunk_filename: str) -> _FileIndex | None:
+        chunk_path = self.chunks_dir / chunk_filename
+        try:
+            stat = chunk_path.stat()
+        except OSError:
+            return None
+
+        with self._lock:
+            index = self._indexes.get(chunk_filename)
+            if index and (index.size, index.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                return index
+
+            index_path = self._index_path(chunk_filename)
+            if index_path.exists():
+                try:
+                    data = json.loads(index_path.read_text(encoding="utf-8"))
+                    if data.get("format") == INDEX_FORMAT_VERSION and (
+                        data["size"],
+                        data["mtime_ns"],
+                    ) == (stat.st_size, stat.st_mtime_ns):
+                        index = _FileIndex.from_json(data)
+                        self._indexes[chunk_filename] = index
+                        return index
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable chunk index {index_path}: {e}")
+
+            index = self._build(chunk_path, stat.st_size, stat.st_mtime_ns)
+            self._indexes[chunk_filename] = index
+            try:
+                self.index_dir.mkdir(parents=True, exist_ok=True)
+                tmp = index_path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(index.to_json()), encoding="utf-8")
+                os.replace(tmp, index_path)
+            except OSError as e:
+                logger.warning(f"Could not persist chunk index {index_path}: {e}")
+            logger.info(
+                "Indexed %s: %d chunks, %d terms",
+                chunk_filename,
+                len(index.offsets),
+                len(index.postings),
+            )
+            return index
+
+    def _read(self, chunk_filename: str, offset: int, length: int) -> dict | None:
+        try:
+            with open(self.chunks_dir / chunk_filename, "rb") as f:
+                f.seek(offset)
+                return json.loads(f.read(length))
+        except Exception:
+            return None
+
+    def get(self, chunk_filename: str, chunk_id: str) -> dict | None:
+        """Return the chunk entry with `id == chunk_id` from `chunk_filename`, or None."""
+        index = self._get_index(chunk_filename)
+        if index is None:
+            return None
+        loc = index.offsets.get(chunk_id)
+        if loc is None:
+            return None
+        return self._read(chunk_filename, *loc)
+
+    def find_by_terms(
+        self, chunk_filename: str, terms: list[str], limit: int = 5
+    ) -> list[dict]:
+        """
+        Return up to `limit` entries (in file order) whose content contains any of
+        `terms` as a case-insensitive substring. Candidates come from the posting
+        lists and are then checked exactly, so results match a full file scan.
+        """
+        lowered_terms = [t.lower() for t in terms if isinstance(t, str) and t.strip()]
+        if not lowered_terms:
+            return []
+        index = self._get_index(chunk_filename)
+        if index is None:
+            return []
+
+        candidates: set[int] = set()
+        for term in lowered_terms:
+            words = _words(term)
+            if not words:
+                # Nothing to look up (no ASCII letters/digits): every line is a candidate.
+                candidates = set(range(len(index.line_offsets)))
+                break
+            # A substring match of the term puts each of its words inside some
+            # indexed word ("transformer" in "transformers"), so union the posting
+            # lists of all indexed words containing it; the exact check below filters.
+            hits: set[int] | None = None
+            for w in words:
+                lines: set[int] = set()
+                for vocab_word in index.words_containing(w):
+                    lines.update(index.postings[vocab_word])
+                hits = lines if hits is None else hits & lines
+                if not hits:
+                    break
+            candidates.update(hits or ())
+
+        matches: list[dict] = []
+        for ordinal in sorted(candidates):
+            obj = self._read(chunk_filename, *index.line_offsets[ordinal])
+            if not obj:
+                continue
+            content = obj.get("content", "")
+            if not isinstance(content, str):
+                continue
+            hay = content.lower()
+            if any(t in hay for t in lowered_terms):
+                matches.append(obj)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+
+def get_chunk_store(chunks_dir: Path) -> ChunkStore:
+    """Process-wide ChunkStore for `chunks_dir`, so indexes are built once per process."""
+    chunks_dir = Path(chunks_dir).resolve()
+    with _stores_lock:
+        store = _stores.get(chunks_dir)
+        if store is None:
+            store = _stores[chunks_dir] = ChunkStore(chunks_dir)
+    return store
@@ -0,0 +1,192 @@
+"""
+Persistent, content-addressed embedding cache.
+
+Vectors are keyed by (model name, prompt_name, quantization, sha256 of the
+text). Each (model, prompt_name, quantization) gets its own namespace
+directory containing:
+
+    keys.txt     one sha256 hex digest per line; line number == vector row
+    vectors.f32  raw float32 rows, read back through a numpy memmap
+    meta.json    model name, prompt_name, quantization and embedding dimension
+
+Only texts whose hash is not present yet are sent to the embedding function,
+so rebuilding a vector store after adding one document re-embeds only that
+document's chunks.
+"""
+
+import re
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _namespace_dirname(model_name: str, prompt_name: str, quantization: str | None = None) -> str:
+    # Full-precision namespaces keep their original (quantization-free) names.
+    parts = [model_name, prompt_name] + ([quantization] if quantization else [])
+    readable = re.sub(r"[^A-Za-z0-9_.-]+", "_", "__".join(parts))
+    digest = hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+    return f"{readable}_{digest[:8]}"
+
+
+class EmbeddingCache:
+    """
+    Append-only float32 vector cache for one (model_name, prompt_name, quantization).
+
+    `quantization` is the mode the model runs in ("fp16"/"int8", None for full
+    precision); vectors from different modes differ and are never mixed.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        model_name: str,
+        prompt_name: str,
+        quantization: str | None = None,
+    ):
+        self.model_name = model_name
+        self.prompt_name = prompt_name
+        self.quantization = quantization
+        self.dir = Path(cache_dir) / _namespace_dirname(model_name, prompt_name, quantization)
+        self.keys_path = self.dir / "keys.txt"
+        self.vectors_path = self.dir / "vectors.f32"
+        self.meta_path = self.dir / "meta.json"
+
+        self._lock = threading.Lock()
+        self._rows: dict[str, int] = {}
+        self._dim: int | None = None
+        self._vectors: np.memmap | None = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, text: str) -> bool:
+        return text_sha256(text) in self._rows
+
+    def _load(self) -> None:
+        if not self.meta_path.exists():
+            return
+        try:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            self._dim = int(meta["dim"])
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable embedding cache at {self.dir}: {e}")
+            return
+
+        keys: list[str] = []
+        if self.keys_path.exists():
+            with open(self.keys_path, "r", encoding="utf-8") as f:
+                keys = [line.strip() for line in f if line.strip()]
+
+        row_bytes = self._dim * 4
+        stored_rows = (
+            self.vectors_path.stat().st_size // row_bytes
+            if self.vectors_path.exists()
+            else 0
+        )
+
+        # Vectors are written before keys, so an interrupted append can only leave
+        # trailing vectors without keys (or a partial trailing row). Trim both sides
+        # to the common prefix so rows stay aligned with key line numbers.
+        n = min(len(keys), stored_rows)
+        if n < len(keys):
+            keys = keys[:n]
+            self.keys_path.write_text(
+                "".join(k + "\n" for k in keys), encoding="utf-8"
+            )
+        if self.vectors_path.exists() and self.vectors_path.stat().st_size != n * row_bytes:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(n * row_bytes)
+
+        self._rows = {k: i for i, k in enumerate(keys)}
+        self._remap()
+        logger.info(
+            f"Loaded embedding cache {self.dir.name} with {len(self._rows)} vectors (dim={self._dim})"
+        )
+
+    def _remap(self) -> None:
+        n = len(self._rows)
+        if n and self._dim:
+            self._vectors = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(n, self._dim)
+            )
+        else:
+            self._vectors = None
+
+    def _append(self, keys: list[str], vectors: np.ndarray) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if self._dim is None:
+            self._dim = int(vectors.shape[1])
+            self.meta_path.write_text(
+                json.dumps(
+                    {
+                        "model_name": self.model_name,
+                        "prompt_name": self.prompt_name,
+                        "quantization": self.quantization,
+                        "dim": self._dim,
+                    },
+                    indent=2,
+                ),
+                encoding="utf-8",
+            )
+        elif vectors.shape[1] != self._dim:
+            raise ValueError(
+                f"Embedding dimension {vectors.shape[1]} does not match cache dimension {self._dim}"
+            )
+
+        # Release the read-only map before growing the file underneath it.
+        self._vectors = None
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self.keys_path, "a", encoding="utf-8") as f:
+            f.write("".join(k + "\n" for k in keys))
+
+        start = len(self._rows)
+        for i, k in enumerate(keys):
+            self._rows[k] = start + i
+        self._remap()
+
+    def embed(
+        self,
+        texts: Sequence[str],
+        embed_fn: Callable[[list[str]], Sequence[Sequence[float]]],
+    ) -> np.ndarray:
+        """
+        Return a (len(texts), dim) float32 array, calling `embed_fn` only for
+        texts that are not cached yet.
+        """
+        keys = [text_sha256(t) for t in texts]
+
+        with self._lock:
+            missing: dict[str, str] = {}
+            for k, t in zip(keys, texts):
+                if k not in self._rows and k not in missing:
+                    missing[k] = t
+
+            logger.info(
+                f"Embedding cache {self.dir.name}: {len(texts) - sum(1 for k in keys if k in missing)} hits, "
+                f"{len(missing)} unique misses"
+            )
+
+            if missing:
+                new_vectors = np.asarray(
+                    embed_fn(list(missing.values())), dtype=np.float32
+                )
+                self._append(list(missing.keys()), new_vectors)
+
+            if not keys:
+                return np.empty((0, self._dim or 0), dtype=np.float32)
+
+            rows = np.fromiter((self._rows[k] for k in keys), dtype=np.int64)
+            return np.array(self._vectors[rows], dtype=np.float32)
@@ -0,0 +1,228 @@
+"""
+Shared EmbeddingGemma provider.
+
+Every agent/script that needs dense embeddings goes through this module so that
+each SentenceTransformer model is loaded at most once per process and then kept
+warm for subsequent vector store loads, rebuilds and queries.
+
+Configuration (constructor args take precedence over environment variables):
+    EMBEDDING_DEVICE        e.g. "cpu", "cuda", "mps" (default: SentenceTransformers auto-detect)
+    EMBEDDING_NUM_THREADS   torch intra-op thread count for CPU inference (default: torch default)
+    EMBEDDING_BATCH_SIZE    texts per encode() call when embedding documents (default: 32)
+    EMBEDDING_QUANTIZATION  "fp16" or "int8" (dynamic int8 quantization of Linear layers, CPU only)
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "google/embeddinggemma-300m"
+DEFAULT_BATCH_SIZE = 32
+QUANTIZATION_MODES = ("fp16", "int8")
+
+# (model_name, device, quantization) -> SentenceTransformer
+_MODEL_REGISTRY: dict[tuple[str, str | None, str | None], object] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _env_device() -> str | None:
+    return os.getenv("EMBEDDING_DEVICE") or None
+
+
+def _env_num_threads() -> int | None:
+    value = os.getenv("EMBEDDING_NUM_THREADS")
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("Ignoring invalid EMBEDDING_NUM_THREADS=%r", value)
+        return None
+
+
+def _env_batch_size() -> int:
+    value = os.getenv("EMBEDDING_BATCH_SIZE")
+    if value:
+        try:
+            return max(1, int(value))
+        except ValueError:
+            logger.warning("Ignoring invalid EMBEDDING_BATCH_SIZE=%r", value)
+    return DEFAULT_BATCH_SIZE
+
+
+def _env_quantization() -> str | None:
+    return os.getenv("EMBEDDING_QUANTIZATION") or None
+
+
+def _quantize(model, quantization: str, device: str | None):
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(
+            f"Unsupported quantization {quantization!r}; expected one of {QUANTIZATION_MODES}"
+        )
+    if quantization == "fp16":
+        return model.half()
+
+    import torch
+
+    if device not in (None, "cpu") or str(model.device) != "cpu":
+        logger.warning("int8 dynamic quantization only applies to CPU; skipping.")
+        return model
+    return torch.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def get_sentence_transformer(
+    model_name: str = DEFAULT_EMBEDDING_MODEL,
+    device: str | None = None,
+    num_threads: int | None = None,
+    quantization: str | None = None,
+):
+    """
+    Return the process-wide SentenceTransformer for (model_name, device, quantization),
+    loading it on first use.
+    """
+    device = device or _env_device()
+    quantization = quantization or _env_quantization()
+    key = (model_name, device, quantization)
+
+    model = _MODEL_REGISTRY.get(key)
+    if model is not None:
+        return model
+
+    with _REGISTRY_LOCK:
+        model = _MODEL_REGISTRY.get(key)
+        if model is None:
+            threads = num_threads or _env_num_threads()
+            if threads:
+                import torch
+
+                torch.set_num_threads(threads)
+
+            from sentence_transformers import SentenceTransformer
+
+            logger.info(
+                "Loading embedding model %s (device=%s, threads=%s, quantization=%s)...",
+                model_name,
+                device or "auto",
+                threads or "default",
+                quantization or "none",
+            )
+            model = SentenceTransformer(model_name, device=device)
+            if quantization:
+                model = _quantize(model, quantization, device)
+            _MODEL_REGISTRY[key] = model
+    return model
+
+
+def clear_embedding_models() -> None:
+    """Drop all cached models (mainly useful to free memory in long-lived processes)."""
+    with _REGISTRY_LOCK:
+        _MODEL_REGISTRY.clear()
+
+
+class EmbeddingGemmaWrapper(Embeddings):
+    """Wrapper for Google's EmbeddingGemma model via SentenceTransformers."""
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_EMBEDDING_MODEL,
+        device: str | None = None,
+        num_threads: int | None = None,
+        batch_size: int | None = None,
+        quantization: str | None = None,
+    ):
+        self.model_name = model_name
+        self.device = device
+        self.num_threads = num_threads
+        self.batch_size = batch_size or _env_batch_size()
+        self.quantization = quantization
+
+    @property
+    def model(self):
+        # Resolved lazily so constructing the wrapper never triggers a model load.
+        return get_sentence_transformer(
+            self.model_name,
+            device=self.device,
+            num_threads=self.num_threads,
+            quantization=self.quantization,
+        )
+
+    def encode_documents(
+        self, texts: Sequence[str], batch_size: int | None = None
+    ) -> np.ndarray:
+        """
+        Embed documents into a (len(texts), dim) float32 array.
+
+        Texts are encoded longest-first in fixed-size batches so each batch pads
+        to similar lengths; rows are returned in the caller's original order.
+        """
+        batch_size = batch_size or self.batch_size
+        n = len(texts)
+        if n == 0:
+            return np.empty((0, 0), dtype=np.float32)
+
+        model = self.model
+        order = sorted(range(n), key=lambda i: len(texts[i]), reverse=True)
+        out: np.ndarray | None = None
+        t0 = time.perf_counter()
+
+        for start in range(0, n, batch_size):
+            idx = order[start : start + batch_size]
+            batch = model.encode(
+                [texts[i] for i in idx],
+                prompt_name="document",
+                normalize_embeddings=True,
+                batch_size=len(idx),
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            if out is None:
+                out = np.empty((n, batch.shape[1]), dtype=np.float32)
+            out[idx] = batch
+
+            done = min(start + batch_size, n)
+            logger.info(
+                "Embedded %d/%d documents (%.1f docs/s)",
+                done,
+                n,
+                done / max(time.perf_counter() - t0, 1e-9),
+            )
+
+        return out
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed search docs."""
+        return self.encode_documents(texts).tolist()
+
+    def encode_queries(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed several queries in one encode() call into a (len(texts), dim) float32 array."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.asarray(
+            self.model.encode(
+                list(texts),
+                prompt_name="query",
+                normalize_embeddings=True,
+                batch_size=len(texts),
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            ),
+            dtype=np.float32,
+        )
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed query text."""
+        embedding = self.model.encode(
+            text,
+            prompt_name="query",
+            normalize_embeddings=True,
+        )
+        return embedding.tolist()
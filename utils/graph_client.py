@@ -0,0 +1,199 @@
+"""
+Process-wide Neo4j client shared by every graph query in a process.
+
+`Neo4jGraph(...)` opens a new driver and runs APOC schema introspection on
+construction, and callers then also query `db.relationshipTypes()`. Doing that
+per question costs hundreds of ms. `get_graph_client()` instead keeps one
+driver (with its connection pool) per (uri, username, database). The schema
+string and relationship types are cached and refreshed when:
+
+    - GRAPH_SCHEMA_TTL_S seconds have passed (default 600), or
+    - `invalidate()` / `invalidate_graph_cache()` is called in-process, or
+    - the graph version stamp written by `bump_graph_version()` changes
+      (agent 5 bumps it after ingesting, so query processes pick it up).
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_neo4j import Neo4jGraph
+
+logger = logging.getLogger(__name__)
+
+project_root = Path(__file__).resolve().parent.parent
+GRAPH_VERSION_PATH = project_root / "knowledge_graph_outputs" / "graph_version.json"
+DEFAULT_SCHEMA_TTL_S = 600.0
+
+_clients: dict[tuple[str | None, str | None, str | None], "GraphClient"] = {}
+_clients_lock = threading.Lock()
+
+
+# (mtime_ns, size) of graph_version.json -> its parsed version, so the hot path
+# (every schema access and answer-cache lookup) only stats the file.
+_version_cache: tuple[tuple[int, int] | None, str] = (None, "")
+
+
+def graph_version() -> str:
+    """Opaque id of the last ingestion (empty string if nothing was ever ingested)."""
+    global _version_cache
+    try:
+        st = GRAPH_VERSION_PATH.stat()
+    except OSError:
+        return ""
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached_stamp, cached_version = _version_cache
+    if stamp == cached_stamp:
+        return cached_version
+    try:
+        version = json.loads(GRAPH_VERSION_PATH.read_text(encoding="utf-8")).get("version", "")
+    except (OSError, ValueError):
+        return ""
+    _version_cache = (stamp, version)
+    return version
+
+
+def bump_graph_version() -> str:
+    """Record that the graph changed; cached schemas/answers keyed on the version go stale."""
+    version = uuid.uuid4().hex
+    GRAPH_VERSION_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = GRAPH_VERSION_PATH.with_suffix(".tmp")
+    tmp.write_text(
+        json.dumps({"version": version, "updated_at": time.time()}), encoding="utf-8"
+    )
+    os.replace(tmp, GRAPH_VERSION_PATH)
+    return version
+
+
+class GraphClient:
+    """A long-lived Neo4jGraph plus a TTL-cached schema and relationship-type list."""
+
+    def __init__(
+        self,
+        url: str | None,
+        username: str | None,
+        password: str | None,
+        database: str | None = None,
+        schema_ttl_s: float = DEFAULT_SCHEMA_TTL_S,
+    ):
+        from langchain_neo4j import Neo4jGraph
+
+        logger.info(f"Connecting to Neo4j at {url}...")
+        # Schema introspection is deferred to the first `schema` access.
+        self._graph = Neo4jGraph(
+            url=url,
+            username=username,
+            password=password,
+            database=database,
+            refresh_schema=False,
+        )
+        self.schema_ttl_s = schema_ttl_s
+        self._lock = threading.Lock()
+        self._schema: str | None = None
+        self._relationship_types: list[str] = []
+        self._loaded_at = 0.0
+        self._loaded_version: str | None = None
+
+    def _is_stale(self) -> bool:
+        return (
+            self._schema is None
+            or time.monotonic() - self._loaded_at > self.schema_ttl_s
+            or self._loaded_version != graph_version()
+        )
+
+    def _ensure_schema(self) -> None:
+        if not self._is_stale():
+            return
+        with self._lock:
+            if not self._is_stale():
+                return
+            version = graph_version()
+            t0 = time.perf_counter()
+            self._graph.refresh_schema()
+            try:
+                rows = self._graph.query(
+                    "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType ORDER BY relationshipType"
+                )
+                relationship_types = [
+                    r.get("relationshipType")
+                    for r in (rows or [])
+                    if r.get("relationshipType")
+                ]
+            except Exception as e:
+                logger.warning(f"Could not list relationship types: {e}")
+                relationship_types = []
+            self._schema = self._graph.schema
+            self._relationship_types = relationship_types
+            self._loaded_at = time.monotonic()
+            self._loaded_version = version
+            logger.info(
+                "Refreshed Neo4j schema cache (%d relationship types) in %d ms",
+                len(relationship_types),
+                int((time.perf_counter() - t0) * 1000),
+            )
+
+    @property
+    def graph(self) -> "Neo4jGraph":
+        """The shared Neo4jGraph, with its schema attributes kept fresh for Cypher chains."""
+        self._ensure_schema()
+        return self._graph
+
+    @property
+    def schema(self) -> str:
+        self._ensure_schema()
+        return self._schema or ""
+
+    @property
+    def relationship_types(self) -> list[str]:
+        self._ensure_schema()
+        return list(self._relationship_types)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._schema = None
+
+    def close(self) -> None:
+        self._graph.close()
+
+
+def get_graph_client(
+    url: str | None = None,
+    username: str | None = None,
+    password: str | None = None,
+    database: str | None = None,
+) -> GraphClient:
+    """Return the process-wide client for the given (or NEO4J_* env) credentials."""
+    url = url or os.getenv("NEO4J_URI")
+    username = username or os.getenv("NEO4J_USERNAME")
+    password = password or os.getenv("NEO4J_PASSWORD")
+    database = database or os.getenv("NEO4J_DATABASE")
+    key = (url, username, database)
+
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = GraphClient(
+                url,
+                username,
+                password,
+                database=database,
+                schema_ttl_s=float(os.getenv("GRAPH_SCHEMA_TTL_S", DEFAULT_SCHEMA_TTL_S)),
+            )
+            _clients[key] = client
+    return client
+
+
+def invalidate_graph_cache() -> None:
+    """Drop cached schemas of all clients in this process (e.g. right after ingestion)."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.invalidate()
@@ -0,0 +1,117 @@
+"""
+Import-time profile of an agent/script CLI.
+
+Runs the script in a fresh interpreter with `python -X importtime` (by default
+with `--help`, i.e. the pure startup path) and summarizes where startup goes:
+top-level imports by cumulative time, the most expensive modules by self time,
+and self time grouped by top-level package. The report is printed and written
+to `logs/import_profile_<script>.txt`.
+
+Usage:
+    uv run utils/import_profile.py agents/6-query_agent.py
+    uv run utils/import_profile.py chunking_strategy/semantic_chunking.py --top 30
+    uv run utils/import_profile.py agents/6-query_agent.py --script-args "what is attention?"
+"""
+
+import re
+import sys
+import shlex
+import argparse
+import subprocess
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+logs_dir = project_root / "logs"
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S.*)$")
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """Parse `-X importtime` output into [(module, self_us, cumulative_us, depth)]."""
+    entries = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        entries.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def profile_script(script: Path, script_args: list[str]) -> tuple[float, list, int]:
+    """Run `script` under -X importtime; return (wall seconds, entries, exit code)."""
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", str(script), *script_args],
+        cwd=project_root,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    wall_s = time.perf_counter() - t0
+    return wall_s, parse_importtime(proc.stderr), proc.returncode
+
+
+def format_report(
+    script: Path, script_args: list[str], wall_s: float, entries: list, top: int
+) -> str:
+    top_level = [e for e in entries if e[3] == 0]
+    total_import_us = sum(e[2] for e in top_level)
+
+    by_package: dict[str, int] = {}
+    for module, self_us, _, _ in entries:
+        package = module.split(".", 1)[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+
+    lines = [
+        f"Import profile: {script} {shlex.join(script_args)}".rstrip(),
+        f"Process wall time: {wall_s * 1000:.0f} ms",
+        f"Total import time: {total_import_us / 1000:.0f} ms ({len(entries)} modules)",
+        "",
+        f"Top-level imports by cumulative time (top {top}):",
+    ]
+    for module, _, cumulative_us, _ in sorted(top_level, key=lambda e: -e[2])[:top]:
+        lines.append(f"  {cumulative_us / 1000:9.1f} ms  {module}")
+
+    lines += ["", f"Modules by self time (top {top}):"]
+    for module, self_us, _, _ in sorted(entries, key=lambda e: -e[1])[:top]:
+        lines.append(f"  {self_us / 1000:9.1f} ms  {module}")
+
+    lines += ["", f"Packages by self time (top {top}):"]
+    for package, self_us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+        lines.append(f"  {self_us / 1000:9.1f} ms  {package}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile report for a script's startup.")
+    parser.add_argument("script", help="Script to profile, e.g. agents/6-query_agent.py")
+    parser.add_argument(
+        "--script-args",
+        default="--help",
+        help='Arguments passed to the script (default: "--help", i.e. startup only).',
+    )
+    parser.add_argument("--top", type=int, default=20, help="Rows per section.")
+    args = parser.parse_args()
+
+    script = Path(args.script)
+    script_args = shlex.split(args.script_args)
+    wall_s, entries, returncode = profile_script(script, script_args)
+    if not entries:
+        print(f"No import timings captured (exit code {returncode}).")
+        sys.exit(1)
+
+    report = format_report(script, script_args, wall_s, entries, args.top)
+    print(report)
+
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    report_path = logs_dir / f"import_profile_{script.stem}.txt"
+    report_path.write_text(report, encoding="utf-8")
+    print(f"Report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Deferred construction of objects whose imports are expensive.
+
+Importing LangChain prompt/tool machinery pulls in langsmith, tracers and
+pydantic models (close to a second), even for `--help` or an answer-cache hit.
+A `LazyObject` runs its factory, and therefore the imports inside it, on first
+attribute access or call. After that it delegates to the built object:
+
+    CYPHER_PROMPT = LazyObject(build_cypher_prompt)   # nothing imported yet
+    CYPHER_PROMPT.format(...)                          # factory runs here
+
+`lazy_tool` is the lazy counterpart of `langchain_core.tools.tool`. Code that
+needs the real object (e.g. pydantic-validated fields) calls `.resolve()`.
+"""
+
+import threading
+from typing import Any, Callable
+
+
+class LazyObject:
+    """Proxy that builds `factory()` once, on first use, and delegates to it."""
+
+    __slots__ = ("_factory", "_value", "_lock", "__wrapped__")
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_value", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def resolve(self) -> Any:
+        if self._factory is not None:
+            with self._lock:
+                if self._factory is not None:
+                    object.__setattr__(self, "_value", self._factory())
+                    object.__setattr__(self, "_factory", None)
+        return self._value
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.resolve(), name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        if self._factory is not None:
+            return f"<LazyObject (unresolved) {getattr(self._factory, '__qualname__', self._factory)!r}>"
+        return repr(self._value)
+
+
+def lazy_tool(func: Callable) -> LazyObject:
+    """`@tool`, but the StructuredTool (and langchain_core) is built on first use."""
+
+    def _build():
+        from langchain_core.tools import tool
+
+        return tool(func)
+
+    proxy = LazyObject(_build)
+    object.__setattr__(proxy, "__wrapped__", func)
+    return proxy
+
+
+def lazy_prompt_template(**kwargs) -> LazyObject:
+    """`PromptTemplate(**kwargs)`, built on first use."""
+
+    def _build():
+        from langchain_core.prompts import PromptTemplate
+
+        return PromptTemplate(**kwargs)
+
+    return LazyObject(_build)
@@ -0,0 +1,218 @@
+"""
+Structure-aware markdown chunking on top of `utils.token_chunker`.
+
+`StructuredDocument` is a `TokenizedDocument` that knows the layout of the
+markdown produced by the PDF/image pipeline:
+
+    fences    fenced blocks (```json image metadata, ``` code/tables). A chunk
+              never ends, and an overlap never starts, inside one. A chunk that
+              stops before a block is followed by a chunk starting at the block,
+              so a block longer than the chunk size becomes a single oversized
+              chunk.
+    headings  section headers as recognized by
+              `markdown_outputs.image_extraction_utils.is_section_header`.
+              They are the strongest cut: a chunk ends at the last heading past
+              a quarter of its size (other separators need half), and an overlap
+              never reaches back across one.
+    pages     standalone page-number lines, read the same way as
+              `find_page_number_nearby`: a position belongs to the last page
+              number before it.
+
+`chunks_with_metadata(size, overlap)` returns each chunk with its section path
+and page range, so chunk records can be looked up by section.
+"""
+
+import re
+import bisect
+import logging
+from dataclasses import dataclass, field
+
+from markdown_outputs.image_extraction_utils import (
+    extract_section_header_text,
+    is_section_header,
+)
+from utils.token_chunker import DEFAULT_ENCODING, TokenizedDocument
+
+logger = logging.getLogger(__name__)
+
+# Headings outrank every separator strength in utils.token_chunker.
+_SECTION = 4
+
+_FENCE_RE = re.compile(r"^\s*(`{3,}|~{3,})")
+_MD_HEADING_RE = re.compile(r"^(#+)")
+_NUMBERED_HEADING_RE = re.compile(r"^\*\*(\d+(?:\.\d+)*)\*\*")
+
+
+def heading_level(line: str) -> int:
+    """
+    Nesting level of a section header line.
+
+    `## Title` -> 2 (number of '#'), `**3** **Title**` -> 3, `**3.1** **Title**` -> 4,
+    and standalone bold sections (`**Abstract**`, `**References**`) -> 3.
+    """
+    line = line.strip()
+    match = _MD_HEADING_RE.match(line)
+    if match:
+        return len(match.group(1))
+    match = _NUMBERED_HEADING_RE.match(line)
+    if match:
+        return 2 + len(match.group(1).split("."))
+    return 3
+
+
+@dataclass
+class MarkdownLayout:
+    """Char-offset layout of a markdown document."""
+
+    # [(start, end)] of fenced blocks, end exclusive (past the closing fence line)
+    fences: list[tuple[int, int]] = field(default_factory=list)
+    # [(line start, section path)] for every section header, in order
+    headings: list[tuple[int, list[str]]] = field(default_factory=list)
+    # [(line start, page number)] for every accepted page-number line
+    pages: list[tuple[int, int]] = field(default_factory=list)
+
+    def section_path_at(self, pos: int) -> list[str]:
+        i = bisect.bisect_right(self.headings, pos, key=lambda h: h[0]) - 1
+        return list(self.headings[i][1]) if i >= 0 else []
+
+    def page_at(self, pos: int) -> int | None:
+        i = bisect.bisect_right(self.pages, pos, key=lambda p: p[0]) - 1
+        return self.pages[i][1] if i >= 0 else None
+
+
+def parse_markdown_layout(text: str) -> MarkdownLayout:
+    """Find fenced blocks, section headers and page numbers in one pass over the lines."""
+    layout = MarkdownLayout()
+    stack: list[tuple[int, str]] = []  # (level, header text)
+    fence_marker, fence_start = None, 0
+    pos = 0
+    for line in text.splitlines(keepends=True):
+        start, pos = pos, pos + len(line)
+        stripped = line.strip()
+
+        if fence_marker is not None:
+            if stripped == fence_marker:
+                layout.fences.append((fence_start, pos))
+                fence_marker = None
+            continue
+        match = _FENCE_RE.match(line)
+        if match:
+            fence_marker, fence_start = match.group(1), start
+            continue
+
+        if is_section_header(line):
+            level = heading_level(line)
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, extract_section_header_text(line)))
+            layout.headings.append((start, [title for _, title in stack]))
+        elif stripped.isdigit() and len(stripped) <= 4:
+            # Page numbers only increase; anything else is a stray number (tables, lists).
+            page = int(stripped)
+            if not layout.pages or page > layout.pages[-1][1]:
+                layout.pages.append((start, page))
+
+    if fence_marker is not None:
+        logger.warning(f"Unclosed fenced block at char {fence_start}; keeping it to the end")
+        layout.fences.append((fence_start, len(text)))
+    return layout
+
+
+class StructuredDocument(TokenizedDocument):
+    """A `TokenizedDocument` that cuts at headings and never inside fenced blocks."""
+
+    def __init__(self, text: str, encoding_name: str = DEFAULT_ENCODING, encoding=None):
+        super().__init__(text, encoding_name, encoding)
+        self.layout = parse_markdown_layout(text)
+
+        # Fences as token ranges: (last token starting at or before the fence,
+        # first token starting at or after its end).
+        self.fence_tokens: list[tuple[int, int]] = [
+            (
+                max(0, bisect.bisect_right(self.offsets, a) - 1),
+                bisect.bisect_left(self.offsets, b),
+            )
+            for a, b in self.layout.fences
+        ]
+        self._fence_starts = [a for a, _ in self.fence_tokens]
+        self._fence_start_set = set(self._fence_starts)
+
+        for level, cuts in self.cuts.items():
+            self.cuts[level] = [t for t in cuts if self._fence_around(t) is None]
+
+        section_cuts = set()
+        for pos, _ in self.layout.headings:
+            t = bisect.bisect_right(self.offsets, pos) - 1
+            if 0 < t < self.n_tokens:
+                section_cuts.add(t)
+        self.cuts[_SECTION] = sorted(section_cuts)
+        for level in list(self.cuts):
+            if level != _SECTION:
+                self.cuts[level] = sorted(set(self.cuts[level]) | section_cuts)
+
+    def _fence_around(self, t: int) -> tuple[int, int] | None:
+        """The fence token range strictly containing cut `t`, if any."""
+        i = bisect.bisect_left(self._fence_starts, t) - 1
+        if i >= 0 and self.fence_tokens[i][0] < t < self.fence_tokens[i][1]:
+            return self.fence_tokens[i]
+        return None
+
+    def _chunk_end(self, start: int, size: int, overlap: int = 0) -> int:
+        hi = start + size
+        sections = self.cuts[_SECTION]
+        i = bisect.bisect_right(sections, hi) - 1
+        if hi < self.n_tokens and i >= 0 and sections[i] >= start + max(1, size // 4):
+            # Headings win over the usual last-half window: end at one from a quarter in.
+            return sections[i]
+        end = super()._chunk_end(start, size, overlap)
+        fence = self._fence_around(end)
+        if fence is None:
+            return end
+        fence_start, fence_end = fence
+        # Stop right before the block, unless the text before it is too short to
+        # stand alone (max(overlap, size // 4) tokens): then the block, however
+        # large, joins this chunk whole.
+        if fence_start - start > max(overlap, size // 4):
+            return fence_start
+        return fence_end
+
+    def _next_start(self, start: int, end: int, overlap: int) -> int:
+        if end in self._fence_start_set:
+            # The chunk stopped right before a block; the next one starts with it
+            # and keeps it whole, instead of re-reading the text before it.
+            return end
+        return super()._next_start(start, end, overlap)
+
+    def _overlap_start(self, lo: int, end: int) -> int:
+        sections = self.cuts[_SECTION]
+        i = bisect.bisect_right(sections, end - 1) - 1
+        if i >= 0 and sections[i] >= lo:
+            # Don't carry the previous section into the next chunk.
+            return sections[i]
+        start = super()._overlap_start(lo, end)
+        fence = self._fence_around(start)
+        return fence[1] if fence is not None else start
+
+    def chunks_with_metadata(self, size: int, overlap: int = 0) -> list[tuple[str, dict]]:
+        """[(chunk text, {"section", "section_path", "page_start", "page_end"})] for one configuration."""
+        out = []
+        for a, b in self.chunk_spans(size, overlap):
+            raw = self.text[a:b]
+            chunk = raw.strip()
+            if not chunk:
+                continue
+            first = a + (len(raw) - len(raw.lstrip()))
+            last = first + len(chunk) - 1
+            section_path = self.layout.section_path_at(first)
+            out.append(
+                (
+                    chunk,
+                    {
+                        "section": section_path[-1] if section_path else None,
+                        "section_path": section_path,
+                        "page_start": self.layout.page_at(first),
+                        "page_end": self.layout.page_at(last),
+                    },
+                )
+            )
+        return out
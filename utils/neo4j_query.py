@@ -12,6 +12,8 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
+from utils.graph_client import get_graph_client
+
 # Load environment variables
 load_dotenv()
 
@@ -71,13 +73,9 @@ def resolve_entities(graph: Neo4jGraph, query: str, limit: int = 5):
 
 def query_graph(query: str):
     try:
-        url = os.getenv("NEO4J_URI")
-        username = os.getenv("NEO4J_USERNAME")
-        password = os.getenv("NEO4J_PASSWORD")
-        logger.info(f"Connecting to Neo4j at {url}...")
-        graph = Neo4jGraph(url=url, username=username, password=password)
-
-        schema = graph.schema
+        graph_client = get_graph_client()
+        graph = graph_client.graph
+        schema = graph_client.schema
 
         llm = ChatGoogleGenerativeAI(
             model="gemini-2.5-flash",
@@ -0,0 +1,93 @@
+"""
+Rank fusion for multi-subquery RAG retrieval.
+
+Each subquery yields a ranked list of (faiss_id, l2_distance) hits. These are
+fused into one global ranking, either by reciprocal-rank fusion (RRF) or by
+the best cosine similarity any subquery achieved (max-score), and then cut to
+a global top-k that also fits a token budget for the synthesis prompt.
+"""
+
+import logging
+from typing import Iterable, Sequence
+
+logger = logging.getLogger(__name__)
+
+FUSION_METHODS = ("rrf", "max")
+# Standard RRF damping constant (Cormack et al., 2009).
+DEFAULT_RRF_K = 60
+DEFAULT_TOKEN_ENCODING = "cl100k_base"
+
+_ENCODING = None
+
+
+def _encoding():
+    global _ENCODING
+    if _ENCODING is None:
+        import tiktoken
+
+        _ENCODING = tiktoken.get_encoding(DEFAULT_TOKEN_ENCODING)
+    return _ENCODING
+
+
+def count_tokens(text: str) -> int:
+    return len(_encoding().encode(text, disallowed_special=()))
+
+
+def l2_to_cosine(distance: float) -> float:
+    """FAISS L2 returns squared distances; for unit vectors cos = 1 - d/2."""
+    return 1.0 - distance / 2.0
+
+
+def fuse_hits(
+    hits_per_query: Sequence[Sequence[tuple[int, float]]],
+    method: str = "rrf",
+    rrf_k: int = DEFAULT_RRF_K,
+) -> list[tuple[int, float]]:
+    """
+    Fuse per-subquery (faiss_id, distance) hits into [(faiss_id, fused_score)],
+    best first. Ties keep first-seen order.
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method {method!r}; expected one of {FUSION_METHODS}")
+
+    scores: dict[int, float] = {}
+    for hits in hits_per_query:
+        for rank, (row, distance) in enumerate(hits, start=1):
+            if method == "rrf":
+                scores[row] = scores.get(row, 0.0) + 1.0 / (rrf_k + rank)
+            else:
+                sim = l2_to_cosine(distance)
+                scores[row] = max(scores.get(row, sim), sim)
+
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def select_within_budget(
+    ranked: Iterable[tuple[int, float]],
+    texts: dict[int, str],
+    top_k: int,
+    token_budget: int | None,
+) -> list[tuple[int, float, int]]:
+    """
+    Greedily take ranked hits until `top_k` are selected, skipping any chunk
+    that would push the total over `token_budget`. The best hit is always kept.
+
+    Returns [(faiss_id, fused_score, tokens)].
+    """
+    selected: list[tuple[int, float, int]] = []
+    used = 0
+    for row, score in ranked:
+        if len(selected) >= top_k:
+            break
+        tokens = count_tokens(texts[row])
+        if selected and token_budget and used + tokens > token_budget:
+            logger.info(
+                "Skipping chunk row %d (%d tokens): token budget %d would be exceeded",
+                row,
+                tokens,
+                token_budget,
+            )
+            continue
+        selected.append((row, score, tokens))
+        used += tokens
+    return selected
@@ -1,11 +1,29 @@
+import os
+import re
+import sys
 import json
-from typing import List
-from groq import Groq
+import hashlib
+from pathlib import Path
+from typing import TYPE_CHECKING, List
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
+# Add project root to sys.path so this module also runs as a script
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from utils.query_cache import LRUTTLCache, SqliteTTLCache, TieredCache
+
+if TYPE_CHECKING:
+    from groq import Groq
+
 load_dotenv()
 
+DEFAULT_REWRITE_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
+
+_client: "Groq | None" = None
+_default_cache = None
+
 
 # 1. Define the schema using Pydantic
 class SearchQueries(BaseModel):
@@ -14,12 +32,68 @@ class SearchQueries(BaseModel):
     )
 
 
-def generate_rag_subqueries(user_query: str, client: Groq = Groq()) -> List[str]:
+def get_groq_client() -> "Groq":
+    """Import the Groq SDK and build the client on first use instead of at import time."""
+    global _client
+    if _client is None:
+        from groq import Groq
+
+        _client = Groq()
+    return _client
+
+
+def get_rewrite_cache():
+    """
+    Process-wide rewrite cache: an in-memory LRU, backed by SQLite when
+    RAG_REWRITE_CACHE_DB is set. Size/TTL via RAG_REWRITE_CACHE_SIZE (entries)
+    and RAG_REWRITE_CACHE_TTL (seconds).
+    """
+    global _default_cache
+    if _default_cache is None:
+        ttl = float(os.getenv("RAG_REWRITE_CACHE_TTL", 7 * 24 * 3600))
+        memory = LRUTTLCache(
+            max_entries=int(os.getenv("RAG_REWRITE_CACHE_SIZE", 256)), ttl_seconds=ttl
+        )
+        db_path = os.getenv("RAG_REWRITE_CACHE_DB")
+        _default_cache = (
+            TieredCache(memory, SqliteTTLCache(db_path, ttl_seconds=ttl))
+            if db_path
+            else memory
+        )
+    return _default_cache
+
+
+def normalize_query(query: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a question."""
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!. ").lower()
+
+
+def rewrite_cache_key(user_query: str, model: str) -> str:
+    return hashlib.sha256(
+        f"{model}\0{normalize_query(user_query)}".encode("utf-8")
+    ).hexdigest()
+
+
+def generate_rag_subqueries(
+    user_query: str,
+    client: "Groq | None" = None,
+    model: str = DEFAULT_REWRITE_MODEL,
+    cache=None,
+) -> List[str]:
     """
     Use Groq to rewrite the user query into multiple retrieval-optimized
     subqueries using the json_schema response format.
+
+    Rewrites are cached by (normalized query, model) in `cache` (default:
+    `get_rewrite_cache()`), so repeated questions skip the LLM call. Fallbacks
+    after an error are not cached.
     """
-    # groq_client = Groq()
+    cache = cache if cache is not None else get_rewrite_cache()
+    key = rewrite_cache_key(user_query, model)
+    cached = cache.get(key)
+    if cached:
+        return list(cached)
+
     prompt = (
         "You are a retrieval query optimization module sitting in front of a vector database.\n"
         "\n"
@@ -45,8 +119,8 @@ def generate_rag_subqueries(user_query: str, client: Groq = Groq()) -> List[str]
     )
 
     try:
-        response = client.chat.completions.create(
-            model="meta-llama/llama-4-maverick-17b-128e-instruct",  # Or your preferred Groq model
+        response = (client or get_groq_client()).chat.completions.create(
+            model=model,
             messages=[
                 {"role": "system", "content": prompt},
                 {"role": "user", "content": user_query},
@@ -71,7 +145,10 @@ def generate_rag_subqueries(user_query: str, client: Groq = Groq()) -> List[str]
                 seen.add(q)
                 unique_queries.append(q)
 
-        return unique_queries or [user_query]
+        if not unique_queries:
+            return [user_query]
+        cache.set(key, unique_queries)
+        return unique_queries
 
     except Exception as e:
         print(f"Error during structured output generation: {e}")
@@ -0,0 +1,83 @@
+"""
+Client-side throttling for provider calls made from worker threads.
+
+`TokenBucket` caps the request rate shared by all threads (e.g. a provider's
+requests-per-minute quota): it refills `rate` tokens per second up to
+`capacity`, and `acquire()` blocks until a token is available.
+
+`retry_with_backoff` retries a call on transient errors with exponential
+backoff and full jitter, so throttled workers don't retry in lockstep.
+"""
+
+import time
+import random
+import logging
+import threading
+from typing import Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/second, bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, burst: float | None = None) -> "TokenBucket":
+        return cls(requests_per_minute / 60.0, burst)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available and take them; return seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def retry_with_backoff(
+    fn: Callable[[], T],
+    is_retryable: Callable[[Exception], bool],
+    max_retries: int = 4,
+    base_delay: float = 2.0,
+    max_delay: float = 60.0,
+    description: str = "call",
+) -> T:
+    """
+    Call `fn()`, retrying up to `max_retries` times while `is_retryable(error)`.
+
+    Attempt n (from 0) sleeps uniform(0, min(max_delay, base_delay * 2**n)) first.
+    The last error is re-raised.
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))
+            attempt += 1
+            logger.warning(
+                f"{description} failed ({e}); retry {attempt}/{max_retries} in {delay:.1f}s"
+            )
+            time.sleep(delay)
@@ -0,0 +1,128 @@
+"""
+Token-window chunking that tokenizes a document once for any number of
+chunk-size / overlap configurations.
+
+`TokenizedDocument` encodes the text a single time with a cached tiktoken
+encoding and keeps:
+
+    offsets   char offset where each token starts (plus len(text) at the end)
+    cuts      token indices where a chunk may end, by separator strength:
+              paragraph ("\\n\\n") > line ("\\n") > word (whitespace)
+
+`chunk_spans(size, overlap)` then walks the token array: each chunk ends at the
+strongest separator within its last half (falling back to a hard cut at
+`size` tokens), and the next chunk starts `overlap` tokens back, moved forward
+to a word boundary. Every configuration is a walk over the same arrays, so the
+cost of another chunk size is a few binary searches per chunk, not a second
+tokenization.
+
+Chunk sizes are counted in `gpt2` tokens by default, the encoding
+`RecursiveCharacterTextSplitter.from_tiktoken_encoder` uses.
+"""
+
+import bisect
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODING = "gpt2"
+
+# Separator strengths, strongest first.
+_PARAGRAPH, _LINE, _WORD = 3, 2, 1
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = DEFAULT_ENCODING):
+    """tiktoken encoding, loaded once per process."""
+    import tiktoken
+
+    return tiktoken.get_encoding(name)
+
+
+def _cut_strength(text: str, pos: int) -> int:
+    before, after = text[max(0, pos - 2):pos], text[pos:pos + 2]
+    if before.endswith("\n\n") or after.startswith("\n\n"):
+        return _PARAGRAPH
+    if before.endswith("\n") or after.startswith("\n"):
+        return _LINE
+    if before[-1:].isspace() or after[:1].isspace():
+        return _WORD
+    return 0
+
+
+class TokenizedDocument:
+    """A document tokenized once, with char offsets and candidate cut points."""
+
+    def __init__(self, text: str, encoding_name: str = DEFAULT_ENCODING, encoding=None):
+        self.text = text
+        enc = encoding or get_encoding(encoding_name)
+        tokens = enc.encode_ordinary(text)
+        _, offsets = enc.decode_with_offsets(tokens)
+        self.n_tokens = len(tokens)
+        self.offsets: list[int] = offsets + [len(text)]
+
+        # cuts[s] holds the token indices (ascending) whose cut strength is >= s
+        self.cuts: dict[int, list[int]] = {_PARAGRAPH: [], _LINE: [], _WORD: []}
+        for t in range(1, self.n_tokens):
+            strength = _cut_strength(text, self.offsets[t])
+            for level in (_WORD, _LINE, _PARAGRAPH):
+                if strength >= level:
+                    self.cuts[level].append(t)
+
+    def _best_cut(self, lo: int, hi: int) -> int:
+        """Last cut in [lo, hi] at the strongest available separator, else hi."""
+        for level in sorted(self.cuts, reverse=True):
+            cuts = self.cuts[level]
+            i = bisect.bisect_right(cuts, hi) - 1
+            if i >= 0 and cuts[i] >= lo:
+                return cuts[i]
+        return hi
+
+    def _overlap_start(self, lo: int, end: int) -> int:
+        """First word boundary in [lo, end), else lo."""
+        cuts = self.cuts[_WORD]
+        i = bisect.bisect_left(cuts, lo)
+        if i < len(cuts) and cuts[i] < end:
+            return cuts[i]
+        return lo
+
+    def _chunk_end(self, start: int, size: int, overlap: int = 0) -> int:
+        """Token index where the chunk starting at `start` ends."""
+        hi = start + size
+        if hi >= self.n_tokens:
+            return self.n_tokens
+        return self._best_cut(start + max(1, size // 2), hi)
+
+    def _next_start(self, start: int, end: int, overlap: int) -> int:
+        """Token index where the chunk after [start, end) starts."""
+        if not overlap:
+            return end
+        next_start = self._overlap_start(end - overlap, end)
+        # An overlap reaching back to the previous start would make no progress.
+        return next_start if next_start > start else end
+
+    def chunk_spans(self, size: int, overlap: int = 0) -> list[tuple[int, int]]:
+        """[(start_char, end_char)] of chunks of at most `size` tokens overlapping by about `overlap`."""
+        if size <= 0:
+            raise ValueError("size must be positive")
+        if not 0 <= overlap < size:
+            raise ValueError("overlap must be in [0, size)")
+        spans: list[tuple[int, int]] = []
+        start = 0
+        while start < self.n_tokens:
+            end = self._chunk_end(start, size, overlap)
+            spans.append((self.offsets[start], self.offsets[end]))
+            if end >= self.n_tokens:
+                break
+            start = self._next_start(start, end, overlap)
+        return spans
+
+    def chunks(self, size: int, overlap: int = 0) -> list[str]:
+        """Chunk texts (whitespace-stripped, empty chunks dropped) for one configuration."""
+        out = []
+        for a, b in self.chunk_spans(size, overlap):
+            chunk = self.text[a:b].strip()
+            if chunk:
+                out.append(chunk)
+        return out
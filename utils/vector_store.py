@@ -0,0 +1,452 @@
+"""
+FAISS index construction and loading shared by the vector store agent and all
+retrieval paths.
+
+Supported index types:
+    flat   exact L2 search (IndexFlatL2), the LangChain default
+    hnsw   graph-based ANN (IndexHNSWFlat); recall/latency via `ef_search`
+    ivfpq  inverted lists + product quantization (IndexIVFPQ); recall/latency via `nprobe`
+
+The chosen type and its search-time settings are written to `index_config.json`
+next to `index.faiss` and re-applied whenever the index is loaded.
+
+Chunk text and metadata live in `docstore.sqlite` (instead of LangChain's
+pickled `index.pkl`), so loading an index neither unpickles untrusted data nor
+materializes the whole corpus in RAM: each FAISS row id is resolved to its
+document with an indexed SQLite lookup on demand. Loading a store saved before
+that (index.faiss + index.pkl only) raises; `migrate_pickled_docstore` converts
+it once, as an explicit step.
+"""
+
+import os
+import json
+import math
+import pickle
+import hashlib
+import sqlite3
+import logging
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+# The LangChain FAISS wrapper pulls in the runnables/tracing stack; it is only
+# imported where a store is actually built, so e.g. `index_version` stays cheap.
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+INDEX_CONFIG_FILENAME = "index_config.json"
+FAISS_INDEX_FILENAME = "index.faiss"
+DOCSTORE_FILENAME = "docstore.sqlite"
+# LangChain's FAISS.save_local docstore, read once for migration only.
+LEGACY_DOCSTORE_FILENAME = "index.pkl"
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+DEFAULT_HNSW_M = 32
+DEFAULT_EF_CONSTRUCTION = 200
+DEFAULT_EF_SEARCH = 64
+DEFAULT_NPROBE = 8
+DEFAULT_PQ_M = 64
+DEFAULT_PQ_NBITS = 8
+# FAISS warns below ~39 training points per centroid.
+MIN_POINTS_PER_CENTROID = 39
+
+
+def _largest_divisor_at_most(n: int, limit: int) -> int:
+    for d in range(min(n, max(1, limit)), 0, -1):
+        if n % d == 0:
+            return d
+    return 1
+
+
+def build_faiss_index(
+    vectors: np.ndarray,
+    index_type: str = "flat",
+    nprobe: int | None = None,
+    ef_search: int | None = None,
+    hnsw_m: int = DEFAULT_HNSW_M,
+    nlist: int | None = None,
+    pq_m: int = DEFAULT_PQ_M,
+    pq_nbits: int = DEFAULT_PQ_NBITS,
+):
+    """
+    Build and populate a FAISS index of the requested type.
+
+    Returns:
+        (index, config) where config is the JSON-serializable description that
+        `apply_search_params` understands. IVF-PQ falls back to a flat index
+        when there are too few vectors to train it.
+    """
+    import faiss
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index_type {index_type!r}; expected one of {INDEX_TYPES}")
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+
+    if index_type == "ivfpq":
+        nlist = nlist or max(1, int(4 * math.sqrt(n)))
+        nlist = min(nlist, n // MIN_POINTS_PER_CENTROID)
+        # Each PQ sub-quantizer trains 2**pq_nbits centroids on the same vectors.
+        if nlist < 1 or n < MIN_POINTS_PER_CENTROID * 2**pq_nbits:
+            logger.warning(
+                f"Only {n} vectors; too few to train IVF-PQ. Building a flat index instead."
+            )
+            index_type = "flat"
+
+    if index_type == "hnsw":
+        ef_search = ef_search or DEFAULT_EF_SEARCH
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = DEFAULT_EF_CONSTRUCTION
+        index.add(vectors)
+        config = {"index_type": "hnsw", "hnsw_m": hnsw_m, "ef_search": ef_search}
+    elif index_type == "ivfpq":
+        pq_m = _largest_divisor_at_most(dim, pq_m)
+        nprobe = nprobe or DEFAULT_NPROBE
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_nbits)
+        logger.info(f"Training IVF-PQ index (nlist={nlist}, m={pq_m}, nbits={pq_nbits})...")
+        index.train(vectors)
+        index.add(vectors)
+        config = {
+            "index_type": "ivfpq",
+            "nlist": nlist,
+            "pq_m": pq_m,
+            "pq_nbits": pq_nbits,
+            "nprobe": nprobe,
+        }
+    else:
+        index = faiss.IndexFlatL2(dim)
+        index.add(vectors)
+        config = {"index_type": "flat"}
+
+    apply_search_params(index, config)
+    return index, config
+
+
+def apply_search_params(index, config: dict | None) -> None:
+    """Apply the recall/latency settings recorded in `config` to a loaded index."""
+    import faiss
+
+    if not config:
+        return
+    if config.get("index_type") == "hnsw" and config.get("ef_search"):
+        faiss.downcast_index(index).hnsw.efSearch = int(config["ef_search"])
+    elif config.get("index_type") == "ivfpq" and config.get("nprobe"):
+        faiss.extract_index_ivf(index).nprobe = int(config["nprobe"])
+
+
+def supports_remove(config: dict | None) -> bool:
+    """
+    Only flat indexes can delete vectors in place.
+
+    LangChain's `FAISS.delete` renumbers `index_to_docstore_id` as if the
+    remaining rows were compacted, and so does `vector_store_from_index`
+    (row i == documents[i]). `IndexFlat.remove_ids` compacts; HNSW cannot
+    remove at all, and `IndexIVFPQ.remove_ids` keeps the old ids (later adds
+    then reuse live ids), so both are rebuilt instead.
+    """
+    return (config or {}).get("index_type", "flat") == "flat"
+
+
+def save_index_config(index_path: Path, config: dict) -> None:
+    with open(Path(index_path) / INDEX_CONFIG_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+
+def load_index_config(index_path: Path) -> dict:
+    config_path = Path(index_path) / INDEX_CONFIG_FILENAME
+    if not config_path.exists():
+        # Indexes written before index_config.json existed are always flat.
+        return {"index_type": "flat"}
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def index_version(index_path: Path) -> str:
+    """
+    Cheap fingerprint of a saved store (name, size, mtime of its files). It changes
+    whenever agent 4 rebuilds or updates the index; empty if nothing is saved.
+    """
+    index_path = Path(index_path)
+    h = hashlib.sha256()
+    found = False
+    for name in (FAISS_INDEX_FILENAME, DOCSTORE_FILENAME, INDEX_CONFIG_FILENAME):
+        try:
+            st = (index_path / name).stat()
+        except OSError:
+            continue
+        found = True
+        h.update(f"{name}:{st.st_size}:{st.st_mtime_ns};".encode("utf-8"))
+    return h.hexdigest()[:16] if found else ""
+
+
+class SqliteDocstore(Docstore):
+    """
+    Read-only docstore backed by `docstore.sqlite`.
+
+    Tables:
+        documents(doc_id PRIMARY KEY, page_content, metadata JSON)
+        rows(row PRIMARY KEY, doc_id)   -- FAISS row id -> doc_id
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._conn = sqlite3.connect(
+            f"{self.db_path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+        )
+        # Let SQLite serve pages straight from the OS page cache.
+        self._conn.execute("PRAGMA mmap_size = 1073741824")
+        self._lock = threading.Lock()
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def search(self, search: str) -> Document | str:
+        rows = self._query(
+            "SELECT page_content, metadata FROM documents WHERE doc_id = ?", (search,)
+        )
+        if not rows:
+            return f"ID {search} not found."
+        page_content, metadata = rows[0]
+        return Document(id=search, page_content=page_content, metadata=json.loads(metadata))
+
+    def doc_id_for_row(self, row: int) -> str | None:
+        rows = self._query("SELECT doc_id FROM rows WHERE row = ?", (int(row),))
+        return rows[0][0] if rows else None
+
+    def count_rows(self) -> int:
+        return self._query("SELECT count(*) FROM rows")[0][0]
+
+    def iter_rows(self):
+        for row, doc_id in self._query("SELECT row, doc_id FROM rows ORDER BY row"):
+            yield row, doc_id
+
+    def iter_documents(self):
+        """Yield (row, doc_id, Document) in FAISS row order."""
+        for row, doc_id, page_content, metadata in self._query(
+            "SELECT r.row, r.doc_id, d.page_content, d.metadata "
+            "FROM rows r JOIN documents d ON d.doc_id = r.doc_id ORDER BY r.row"
+        ):
+            yield row, doc_id, Document(
+                id=doc_id, page_content=page_content, metadata=json.loads(metadata)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SqliteRowMapping(Mapping):
+    """Lazy `index_to_docstore_id` mapping that resolves FAISS rows via SQLite."""
+
+    def __init__(self, docstore: SqliteDocstore):
+        self._docstore = docstore
+
+    def __getitem__(self, row) -> str:
+        doc_id = self._docstore.doc_id_for_row(int(row))
+        if doc_id is None:
+            raise KeyError(row)
+        return doc_id
+
+    def __iter__(self):
+        for row, _ in self._docstore.iter_rows():
+            yield row
+
+    def __len__(self) -> int:
+        return self._docstore.count_rows()
+
+
+def _write_sqlite_docstore(vector_store: "FAISS", db_path: Path) -> None:
+    _write_sqlite_docstore_from(
+        vector_store.docstore, vector_store.index_to_docstore_id, db_path
+    )
+
+
+def _write_sqlite_docstore_from(docstore, index_to_docstore_id, db_path: Path) -> None:
+    if db_path.exists():
+        db_path.unlink()
+    conn = sqlite3.connect(str(db_path))
+    try:
+        conn.execute(
+            "CREATE TABLE documents (doc_id TEXT PRIMARY KEY, page_content TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        conn.execute("CREATE TABLE rows (row INTEGER PRIMARY KEY, doc_id TEXT NOT NULL)")
+
+        def _records():
+            for row, doc_id in sorted(index_to_docstore_id.items()):
+                doc = docstore.search(doc_id)
+                if not isinstance(doc, Document):
+                    raise ValueError(f"Could not find document for id {doc_id}")
+                yield int(row), doc_id, doc
+
+        with conn:
+            for row, doc_id, doc in _records():
+                conn.execute(
+                    "INSERT INTO rows (row, doc_id) VALUES (?, ?)", (row, doc_id)
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO documents (doc_id, page_content, metadata) VALUES (?, ?, ?)",
+                    (doc_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False)),
+                )
+    finally:
+        conn.close()
+
+
+def save_faiss_vector_store(vector_store: "FAISS", index_path: Path, config: dict) -> None:
+    """Write index.faiss, docstore.sqlite and index_config.json into `index_path`."""
+    import faiss
+
+    index_path = Path(index_path)
+    index_path.mkdir(parents=True, exist_ok=True)
+    faiss.write_index(vector_store.index, str(index_path / FAISS_INDEX_FILENAME))
+    _write_sqlite_docstore(vector_store, index_path / DOCSTORE_FILENAME)
+    save_index_config(index_path, config)
+
+
+def vector_store_from_index(
+    index,
+    embeddings: "Embeddings",
+    documents: list[Document],
+    ids: list[str],
+) -> "FAISS":
+    """Wrap a populated FAISS index (row i == documents[i]) in a LangChain FAISS store."""
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(ids, documents))),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+
+
+def search_by_vectors(
+    vector_store: "FAISS", query_vectors: np.ndarray, k: int
+) -> list[list[tuple[int, float]]]:
+    """
+    Run one `index.search` over a (n_queries, dim) matrix.
+
+    Returns, per query row, the (faiss_id, distance) hits in rank order.
+    Missing results (-1 padding when the index holds fewer than k vectors) are dropped.
+    """
+    query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+    if query_vectors.size == 0:
+        return []
+    distances, rows = vector_store.index.search(query_vectors, k)
+    return [
+        [(int(row), float(dist)) for row, dist in zip(q_rows, q_dists) if row != -1]
+        for q_rows, q_dists in zip(rows, distances)
+    ]
+
+
+def documents_for_rows(vector_store: "FAISS", rows) -> dict[int, Document]:
+    """Resolve FAISS row ids to their documents, fetching each row once."""
+    out: dict[int, Document] = {}
+    for row in rows:
+        row = int(row)
+        if row in out:
+            continue
+        doc_id = vector_store.index_to_docstore_id[row]
+        doc = vector_store.docstore.search(doc_id)
+        if not isinstance(doc, Document):
+            raise ValueError(f"Could not find document for id {doc_id}, got {doc}")
+        out[row] = doc
+    return out
+
+
+def migrate_pickled_docstore(index_path: Path) -> int:
+    """
+    One-time conversion of a legacy `index.pkl` docstore into `docstore.sqlite`
+    (written to a temp file and renamed, so concurrent loaders never see a
+    partial database). Returns the number of rows migrated.
+
+    This unpickles `index.pkl`, so only run it on this pipeline's own
+    FAISS.save_local output. Loading never does it implicitly; run
+    `agents/4-vector_store_creation_agent.py --migrate-legacy-docstore`.
+    """
+    index_path = Path(index_path)
+    pkl_path = index_path / LEGACY_DOCSTORE_FILENAME
+    db_path = index_path / DOCSTORE_FILENAME
+    if not pkl_path.exists():
+        raise FileNotFoundError(f"No legacy docstore to migrate: {pkl_path} not found")
+    with open(pkl_path, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    try:
+        _write_sqlite_docstore_from(docstore, index_to_docstore_id, tmp_path)
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    logger.info(
+        f"Migrated {pkl_path.name} to {db_path.name} ({len(index_to_docstore_id)} rows)"
+    )
+    return len(index_to_docstore_id)
+
+
+def load_faiss_vector_store(
+    index_path: Path, embeddings: "Embeddings", in_memory: bool = False
+) -> "FAISS":
+    """
+    Load a saved store and re-apply the search settings from index_config.json.
+
+    By default documents stay in SQLite and are fetched per hit. Pass
+    `in_memory=True` when the store will be modified (add/delete), which needs
+    LangChain's mutable in-memory docstore.
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    index_path = Path(index_path)
+    db_path = index_path / DOCSTORE_FILENAME
+    if not db_path.exists():
+        if (index_path / LEGACY_DOCSTORE_FILENAME).exists():
+            raise FileNotFoundError(
+                f"{db_path} not found; {index_path} is a legacy index (index.pkl). "
+                "Convert it once with `agents/4-vector_store_creation_agent.py "
+                "--migrate-legacy-docstore`, or rebuild it."
+            )
+        raise FileNotFoundError(
+            f"{db_path} not found; build the index with "
+            "agents/4-vector_store_creation_agent.py."
+        )
+
+    index = faiss.read_index(str(index_path / FAISS_INDEX_FILENAME))
+    config = load_index_config(index_path)
+    apply_search_params(index, config)
+
+    docstore = SqliteDocstore(db_path)
+    if in_memory:
+        ids: list[str] = []
+        documents: list[Document] = []
+        for _, doc_id, doc in docstore.iter_documents():
+            ids.append(doc_id)
+            documents.append(doc)
+        docstore.close()
+        vector_store = vector_store_from_index(index, embeddings, documents, ids)
+    else:
+        vector_store = FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=SqliteRowMapping(docstore),
+        )
+
+    logger.info(
+        f"Loaded {config.get('index_type', 'flat')} FAISS index with {index.ntotal} vectors"
+    )
+    return vector_store
@@ -3,14 +3,14 @@ import logging
 from pathlib import Path
 from dotenv import load_dotenv
 
-from langchain_community.vectorstores import FAISS
-from langchain_core.embeddings import Embeddings
-from sentence_transformers import SentenceTransformer
 
 # Add project root to sys.path
 project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
+from utils.embeddings import EmbeddingGemmaWrapper
+from utils.vector_store import load_faiss_vector_store
+
 # Load environment variables
 load_dotenv()
 
@@ -25,29 +25,6 @@ logger = logging.getLogger(__name__)
 VECTOR_STORE_DIR = project_root / "vector_store_outputs"
 
 
-class EmbeddingGemmaWrapper(Embeddings):
-    """Wrapper for Google's EmbeddingGemma model via SentenceTransformers."""
-
-    def __init__(self, model_name: str = "google/embeddinggemma-300m"):
-        self.model = SentenceTransformer(model_name)
-
-    def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        embeddings = self.model.encode(
-            texts,
-            prompt_name="document",
-            normalize_embeddings=True,
-        )
-        return embeddings.tolist()
-
-    def embed_query(self, text: str) -> list[float]:
-        embedding = self.model.encode(
-            text,
-            prompt_name="query",
-            normalize_embeddings=True,
-        )
-        return embedding.tolist()
-
-
 def load_vector_store():
     """Loads the existing FAISS vector store from disk."""
     try:
@@ -60,9 +37,7 @@ def load_vector_store():
         embeddings = EmbeddingGemmaWrapper(model_name="google/embeddinggemma-300m")
 
         logger.info(f"Loading vector store from {index_path}...")
-        vector_store = FAISS.load_local(
-            str(index_path), embeddings, allow_dangerous_deserialization=True
-        )
+        vector_store = load_faiss_vector_store(index_path, embeddings)
         return vector_store
     except Exception as e:
         logger.error(f"Failed to load vector store: {e}", exc_info=True)